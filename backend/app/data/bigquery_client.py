@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import logging
+from dataclasses import asdict, dataclass, field
 from datetime import date
-from typing import Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import requests
 from google.cloud import bigquery
 
+from app.data.query_cache import get_query_cache, query_cache_key
+
 PROJECT_ID = "ai-practice-479405"
 DATASET_ID = "sample_data_for_ml_models"
 
@@ -15,20 +25,169 @@ EVENTS_TABLE = f"`{PROJECT_ID}.{DATASET_ID}.events`"
 USERS_TABLE = f"`{PROJECT_ID}.{DATASET_ID}.users`"
 
 
+@lru_cache(maxsize=1)
 def get_bq_client() -> bigquery.Client:
     """
-    Return a BigQuery client using Application Default Credentials.
+    Return the process-wide BigQuery client using Application Default Credentials.
 
     Authentication is handled externally via:
       gcloud auth application-default login
+
+    The client is created once so credentials and HTTPS connections are
+    reused; its session gets a connection pool sized by
+    `bigquery.http_pool_size` for concurrent callers.
+    """
+    client = bigquery.Client(project=PROJECT_ID)
+    pool_size = int(_bigquery_settings().get("http_pool_size", 16))
+    session = getattr(client, "_http", None)
+    if isinstance(session, requests.Session):
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+    return client
+
+
+# Target Arrow types for the demand frames; columns are cast batch-by-batch
+DAILY_DEMAND_SCHEMA = pa.schema(
+    [
+        ("date", pa.timestamp("ns")),
+        ("sku", pa.string()),
+        ("total_quantity", pa.float64()),
+    ]
+)
+DEMAND_WITH_CONTEXT_SCHEMA = pa.schema(
+    list(DAILY_DEMAND_SCHEMA)
+    + [
+        ("event_count", pa.float64()),
+        ("active_users", pa.float64()),
+        ("product_category", pa.string()),
+        ("price", pa.float64()),
+    ]
+)
+
+
+def _bqstorage_client():
+    """Return a BigQuery Storage Read API client, or None if unavailable."""
+    try:
+        from google.cloud import bigquery_storage
+    except ImportError:
+        return None
+    try:
+        return bigquery_storage.BigQueryReadClient()
+    except Exception:
+        return None
+
+
+def _query_batches(
+    client,
+    query: str,
+    job_config: Optional[bigquery.QueryJobConfig] = None,
+    report: Optional[QueryReport] = None,
+    max_cache_age: Optional[float] = None,
+) -> Iterator[pa.RecordBatch]:
+    """Run a query and stream its result as Arrow record batches.
+
+    Uses the Storage Read API when the client library is installed and
+    falls back to REST pagination otherwise, without building a DataFrame.
+
+    Results go through the on-disk query cache: a fresh entry (younger
+    than the cache TTL and `max_cache_age`) is served without contacting
+    BigQuery, and if the query fails an expired entry is served instead.
     """
-    return bigquery.Client(project=PROJECT_ID)
+    cache = get_query_cache()
+    key = None
+    if cache is not None:
+        key = query_cache_key(query, job_config.query_parameters if job_config else ())
+        table = cache.get(key, max_age=max_cache_age)
+        if table is not None:
+            if report is not None:
+                report.result_cache_hit = True
+            yield from table.to_batches()
+            return
+
+    try:
+        client = client or get_bq_client()
+        job = client.query(query, job_config=job_config)
+        rows = job.result()
+    except Exception:
+        table = cache.get(key, allow_expired=True) if cache is not None else None
+        if table is None:
+            raise
+        logging.warning("BigQuery query failed; serving expired cached result %s", key[:12])
+        if report is not None:
+            report.result_cache_hit = True
+        yield from table.to_batches()
+        return
+
+    if report is not None:
+        report.update_from_job(job)
+    batches = rows.to_arrow_iterable(bqstorage_client=_bqstorage_client())
+    if cache is not None:
+        batches = cache.write_through(key, batches)
+    yield from batches
+
+
+def _sanitize_batch(batch: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+    """Clean SKUs and cast each column of `batch` to `schema` in Arrow."""
+    columns = []
+    for field in schema:
+        if field.name not in batch.schema.names:
+            continue
+        column = batch.column(field.name)
+        if field.name == "sku":
+            # Sanitize SKU strings: trim whitespace and remove surrounding brackets
+            column = pc.utf8_trim(pc.utf8_trim_whitespace(column.cast(pa.string())), "[]")
+        elif field.name in ("event_count", "active_users"):
+            column = pc.fill_null(column.cast(field.type), 0.0)
+        elif field.name == "product_category":
+            # Matches the previous astype(str) handling of missing categories
+            column = pc.fill_null(column.cast(pa.string()), "None")
+        else:
+            column = column.cast(field.type)
+        columns.append((field, column))
+    return pa.RecordBatch.from_arrays(
+        [c for _, c in columns], schema=pa.schema([f for f, _ in columns])
+    )
+
+
+def _batches_to_frame(batches: Iterator[pa.RecordBatch], schema: pa.Schema) -> pd.DataFrame:
+    batches = list(batches)
+    if not batches:
+        return pd.DataFrame({f.name: pd.Series(dtype=f.type.to_pandas_dtype()) for f in schema})
+    return pa.Table.from_batches(batches).to_pandas()
+
+
+def _write_batches(
+    batches: Iterator[pa.RecordBatch], path: Path, schema: pa.Schema
+) -> int:
+    """Stream batches into a Parquet file; return the number of rows written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    rows = 0
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    tmp_path.replace(path)
+    return rows
+
+
+def _demand_job_config(
+    start_date: Optional[date], end_date: Optional[date], sku: Optional[str]
+) -> bigquery.QueryJobConfig:
+    return bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ScalarQueryParameter("start_date", "DATE", start_date),
+            bigquery.ScalarQueryParameter("end_date", "DATE", end_date),
+            bigquery.ScalarQueryParameter("sku", "STRING", sku),
+        ]
+    )
 
 
 def fetch_daily_demand(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     sku: Optional[str] = None,
+    max_cache_age: Optional[float] = None,
 ) -> pd.DataFrame:
     """
     Fetch daily demand time series from orders only.
@@ -47,10 +206,18 @@ def fetch_daily_demand(
       - date (datetime64)
       - sku  (string, derived from product_ids)
       - total_quantity (float)
+
+    `max_cache_age` (seconds) bounds how old a locally cached result may be;
+    pass 0 to always query BigQuery while it is reachable.
     """
-    client = get_bq_client()
+    return _batches_to_frame(
+        iter_daily_demand_batches(start_date, end_date, sku, max_cache_age=max_cache_age),
+        DAILY_DEMAND_SCHEMA,
+    )
 
-    query = f"""
+
+def _daily_demand_query() -> str:
+    return f"""
     WITH exploded_orders AS (
       SELECT
         order_id,
@@ -75,32 +242,40 @@ def fetch_daily_demand(
     ORDER BY date, sku
     """
 
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("start_date", "DATE", start_date),
-            bigquery.ScalarQueryParameter("end_date", "DATE", end_date),
-            bigquery.ScalarQueryParameter("sku", "STRING", sku),
-        ]
-    )
 
-    job = client.query(query, job_config=job_config)
-    df = job.result().to_dataframe()
-    if not df.empty:
-        df["date"] = pd.to_datetime(df["date"])
-        # Sanitize SKU strings: trim whitespace and remove surrounding brackets
-        df["sku"] = df["sku"].astype(str).str.strip().str.strip("[]")
-        df["total_quantity"] = df["total_quantity"].astype(float)
-    return df
+def iter_daily_demand_batches(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    sku: Optional[str] = None,
+    client=None,
+    max_cache_age: Optional[float] = None,
+) -> Iterator[pa.RecordBatch]:
+    """Stream sanitized daily demand as Arrow batches (see `fetch_daily_demand`)."""
+    for batch in _query_batches(
+        client,
+        _daily_demand_query(),
+        _demand_job_config(start_date, end_date, sku),
+        max_cache_age=max_cache_age,
+    ):
+        yield _sanitize_batch(batch, DAILY_DEMAND_SCHEMA)
 
 
 def fetch_demand_with_context(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     sku: Optional[str] = None,
-) -> pd.DataFrame:
+    materialize: Optional[bool] = None,
+    return_report: bool = False,
+    max_cache_age: Optional[float] = None,
+) -> Union[pd.DataFrame, Tuple[pd.DataFrame, QueryReport]]:
     """
     Fetch daily demand time series enriched with product, event and user context.
 
+    With `return_report=True` a (frame, QueryReport) pair is returned; the
+    report carries bytes processed/billed and the job's query plan stages.
+    See `iter_demand_with_context_batches` for `materialize` and
+    `max_cache_age`.
+
     Schemas (provided):
       orders:
         - order_id STRING
@@ -134,9 +309,99 @@ def fetch_demand_with_context(
         - created_at TIMESTAMP
         - ... (other attributes)
     """
-    client = get_bq_client()
+    report = QueryReport() if return_report else None
+    df = _batches_to_frame(
+        iter_demand_with_context_batches(
+            start_date,
+            end_date,
+            sku,
+            materialize=materialize,
+            report=report,
+            max_cache_age=max_cache_age,
+        ),
+        DEMAND_WITH_CONTEXT_SCHEMA,
+    )
+    if return_report:
+        return df, report
+    return df
 
-    query = f"""
+
+_EVENT_DATE = """COALESCE(
+          DATE(PARSE_DATE('%Y%m%d', CAST(event_date AS STRING))),
+          DATE(TIMESTAMP_MICROS(event_timestamp))
+        )"""
+_EVENT_SKU = "CAST(CAST(items_item_id AS INT64) AS STRING)"
+
+
+def _daily_events_query(filter_sku: bool = False) -> str:
+    sku_filter = f"AND (@sku IS NULL OR {_EVENT_SKU} = @sku)" if filter_sku else ""
+    return f"""
+      SELECT
+        -- prefer event_date if populated, otherwise derive from timestamp
+        {_EVENT_DATE} AS date,
+        {_EVENT_SKU} AS sku,
+        COUNT(*) AS event_count,
+        SUM(IFNULL(items_quantity, 0)) AS event_quantity,
+        SUM(IFNULL(items_price, 0) * IFNULL(items_quantity, 0)) AS event_revenue
+      FROM {EVENTS_TABLE}
+      WHERE 1 = 1
+        AND (@start_date IS NULL OR {_EVENT_DATE} >= @start_date)
+        AND (@end_date IS NULL OR {_EVENT_DATE} <= @end_date)
+        {sku_filter}
+      GROUP BY date, sku
+    """
+
+
+def _daily_users_query() -> str:
+    return f"""
+      SELECT
+        DATE(created_at) AS date,
+        COUNT(DISTINCT user_id) AS active_users
+      FROM {USERS_TABLE}
+      WHERE 1 = 1
+        AND (@start_date IS NULL OR DATE(created_at) >= @start_date)
+        AND (@end_date IS NULL OR DATE(created_at) <= @end_date)
+      GROUP BY date
+    """
+
+
+def _demand_with_context_query(
+    events_table: Optional[str] = None, users_table: Optional[str] = None
+) -> str:
+    """Build the demand-with-context SQL.
+
+    The date and SKU parameters are applied inside every CTE, so rows
+    outside the requested range are dropped before the joins and
+    aggregations. This filters rows; it does not cut bytes scanned: the
+    source tables are not partitioned, and the `@start_date IS NULL OR`
+    guards and the COALESCE'd event date would defeat pruning anyway.
+    When `events_table`/`users_table` name materialized daily aggregates
+    they are read instead of re-aggregating the raw tables.
+    """
+    if events_table:
+        daily_events = f"""
+      SELECT date, sku, event_count
+      FROM {events_table}
+      WHERE 1 = 1
+        AND (@start_date IS NULL OR date >= @start_date)
+        AND (@end_date IS NULL OR date <= @end_date)
+        AND (@sku IS NULL OR sku = @sku)
+    """
+    else:
+        daily_events = _daily_events_query(filter_sku=True)
+    daily_users = (
+        f"""
+      SELECT date, active_users
+      FROM {users_table}
+      WHERE 1 = 1
+        AND (@start_date IS NULL OR date >= @start_date)
+        AND (@end_date IS NULL OR date <= @end_date)
+    """
+        if users_table
+        else _daily_users_query()
+    )
+
+    return f"""
     WITH exploded_orders AS (
       SELECT
         order_id,
@@ -147,6 +412,9 @@ def fetch_demand_with_context(
         TRIM(pid) AS sku
       FROM {ORDERS_TABLE},
       UNNEST(SPLIT(product_ids, ',')) AS pid
+      WHERE 1 = 1
+        AND (@start_date IS NULL OR DATE(order_date) >= @start_date)
+        AND (@end_date IS NULL OR DATE(order_date) <= @end_date)
     ),
     base_orders AS (
       SELECT
@@ -156,32 +424,11 @@ def fetch_demand_with_context(
         SUM(revenue) AS total_revenue
       FROM exploded_orders
       WHERE 1 = 1
-        AND (@start_date IS NULL OR DATE(order_date) >= @start_date)
-        AND (@end_date IS NULL OR DATE(order_date) <= @end_date)
         AND (@sku IS NULL OR sku = @sku)
       GROUP BY date, sku
     ),
-    daily_events AS (
-      SELECT
-        -- prefer event_date if populated, otherwise derive from timestamp
-        COALESCE(
-          DATE(PARSE_DATE('%Y%m%d', CAST(event_date AS STRING))),
-          DATE(TIMESTAMP_MICROS(event_timestamp))
-        ) AS date,
-        CAST(CAST(items_item_id AS INT64) AS STRING) AS sku,
-        COUNT(*) AS event_count,
-        SUM(IFNULL(items_quantity, 0)) AS event_quantity,
-        SUM(IFNULL(items_price, 0) * IFNULL(items_quantity, 0)) AS event_revenue
-      FROM {EVENTS_TABLE}
-      GROUP BY date, sku
-    ),
-    daily_users AS (
-      SELECT
-        DATE(created_at) AS date,
-        COUNT(DISTINCT user_id) AS active_users
-      FROM {USERS_TABLE}
-      GROUP BY date
-    )
+    daily_events AS ({daily_events}),
+    daily_users AS ({daily_users})
     SELECT
       o.date,
       o.sku,
@@ -200,37 +447,170 @@ def fetch_demand_with_context(
     ORDER BY o.date, o.sku
     """
 
+
+def _bigquery_settings() -> dict:
+    try:
+        from app.data_loader import load_config
+
+        return load_config().get("bigquery", {}) or {}
+    except Exception:
+        return {}
+
+
+def _range_key(start_date: Optional[date], end_date: Optional[date]) -> str:
+    # An open-ended range is keyed by today's date so it is rebuilt daily
+    start = start_date.strftime("%Y%m%d") if start_date else "all"
+    end = (end_date or date.today()).strftime("%Y%m%d")
+    return f"{start}_{end}"
+
+
+def materialize_daily_context(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    client=None,
+    dataset: Optional[str] = None,
+    ttl_hours: Optional[float] = None,
+) -> Tuple[str, str]:
+    """Materialize daily event and user aggregates for a date range.
+
+    Tables are named after the range (e.g. `daily_events_20240101_20240131`)
+    and created with `CREATE TABLE IF NOT EXISTS`, so repeated refreshes of
+    the same range reuse them until they expire. Returns the fully
+    qualified (events_table, users_table) names.
+    """
+    settings = _bigquery_settings()
+    client = client or get_bq_client()
+    dataset = dataset or settings.get("materialized_dataset") or DATASET_ID
+    if ttl_hours is None:
+        ttl_hours = float(settings.get("materialized_ttl_hours", 24))
+
+    key = _range_key(start_date, end_date)
     job_config = bigquery.QueryJobConfig(
         query_parameters=[
             bigquery.ScalarQueryParameter("start_date", "DATE", start_date),
             bigquery.ScalarQueryParameter("end_date", "DATE", end_date),
-            bigquery.ScalarQueryParameter("sku", "STRING", sku),
         ]
     )
-    job = client.query(query, job_config=job_config)
-    df = job.result().to_dataframe()
-    if not df.empty:
-        df["date"] = pd.to_datetime(df["date"])
-        # Sanitize SKU strings coming from various tables
-        df["sku"] = df["sku"].astype(str).str.strip().str.strip("[]")
-        df["total_quantity"] = df["total_quantity"].astype(float)
-        if "event_count" in df.columns:
-            df["event_count"] = df["event_count"].fillna(0.0).astype(float)
-        if "active_users" in df.columns:
-            df["active_users"] = df["active_users"].fillna(0.0).astype(float)
-        if "price" in df.columns:
-            df["price"] = df["price"].astype(float)
-        if "product_category" in df.columns:
-            df["product_category"] = df["product_category"].astype(str)
-    return df
+    tables = []
+    for name, select in (
+        ("daily_events", _daily_events_query()),
+        ("daily_users", _daily_users_query()),
+    ):
+        table = f"`{PROJECT_ID}.{dataset}.{name}_{key}`"
+        ddl = f"""
+        CREATE TABLE IF NOT EXISTS {table}
+        OPTIONS (
+          expiration_timestamp = TIMESTAMP_ADD(CURRENT_TIMESTAMP(), INTERVAL {int(ttl_hours * 60)} MINUTE)
+        )
+        AS {select}
+        """
+        client.query(ddl, job_config=job_config).result()
+        tables.append(table)
+    return tables[0], tables[1]
+
+
+@dataclass
+class QueryReport:
+    """Cost and plan summary of a finished query job."""
+
+    job_id: Optional[str] = None
+    total_bytes_processed: Optional[int] = None
+    total_bytes_billed: Optional[int] = None
+    cache_hit: Optional[bool] = None
+    # True when the rows came from the local query cache and no job ran
+    result_cache_hit: bool = False
+    slot_millis: Optional[int] = None
+    stages: List[Dict[str, object]] = field(default_factory=list)
+    materialized_tables: List[str] = field(default_factory=list)
+
+    def update_from_job(self, job) -> None:
+        stages = []
+        for entry in getattr(job, "query_plan", None) or []:
+            stages.append(
+                {
+                    "name": getattr(entry, "name", None),
+                    "status": getattr(entry, "status", None),
+                    "records_read": getattr(entry, "records_read", None),
+                    "records_written": getattr(entry, "records_written", None),
+                }
+            )
+        self.job_id = getattr(job, "job_id", None)
+        self.total_bytes_processed = getattr(job, "total_bytes_processed", None)
+        self.total_bytes_billed = getattr(job, "total_bytes_billed", None)
+        self.cache_hit = getattr(job, "cache_hit", None)
+        self.slot_millis = getattr(job, "slot_millis", None)
+        self.stages = stages
 
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
 
-def list_skus() -> list[str]:
+
+def iter_demand_with_context_batches(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    sku: Optional[str] = None,
+    client=None,
+    materialize: Optional[bool] = None,
+    report: Optional[QueryReport] = None,
+    max_cache_age: Optional[float] = None,
+) -> Iterator[pa.RecordBatch]:
+    """Stream sanitized, typed demand-with-context rows as Arrow batches.
+
+    `client` defaults to the process BigQuery client; any object whose
+    `query(...).result()` exposes `to_arrow_iterable()` can stand in for it.
+    With `materialize` (default: `bigquery.materialize_context` in the
+    config) the daily event/user aggregates are read from range-keyed
+    tables built by `materialize_daily_context`. A `report`, if given, is
+    filled in with the job's bytes scanned and query plan once it finishes.
+    Results younger than `max_cache_age` seconds are served from the local
+    query cache.
     """
-    Return the distinct set of SKUs present in the orders table.
+    if materialize is None:
+        materialize = bool(_bigquery_settings().get("materialize_context", False))
+
+    events_table = users_table = None
+    if materialize:
+        events_table, users_table = materialize_daily_context(start_date, end_date, client=client)
+
+    query = _demand_with_context_query(events_table, users_table)
+    if report is not None and events_table:
+        report.materialized_tables = [events_table, users_table]
+    for batch in _query_batches(
+        client,
+        query,
+        _demand_job_config(start_date, end_date, sku),
+        report=report,
+        max_cache_age=max_cache_age,
+    ):
+        yield _sanitize_batch(batch, DEMAND_WITH_CONTEXT_SCHEMA)
+
+
+def write_demand_with_context_parquet(
+    path: Path,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    sku: Optional[str] = None,
+    client=None,
+    materialize: Optional[bool] = None,
+) -> int:
+    """Stream the demand-with-context query straight into a Parquet file.
+
+    Batches go from BigQuery to disk without materializing a DataFrame.
+    Returns the number of rows written.
     """
-    client = get_bq_client()
+    return _write_batches(
+        iter_demand_with_context_batches(
+            start_date, end_date, sku, client=client, materialize=materialize
+        ),
+        path,
+        DEMAND_WITH_CONTEXT_SCHEMA,
+    )
 
+
+def list_skus(max_cache_age: Optional[float] = None) -> list[str]:
+    """
+    Return the distinct set of SKUs present in the orders table.
+    """
     query = f"""
     SELECT DISTINCT TRIM(pid) AS sku
     FROM {ORDERS_TABLE},
@@ -239,12 +619,9 @@ def list_skus() -> list[str]:
     ORDER BY sku
     """
 
-    job = client.query(query)
-    df = job.result().to_dataframe()
-    if df.empty:
-        return []
-    # Clean SKUs before returning
-    skus = df["sku"].astype(str).str.strip().str.strip("[]")
-    return skus.tolist()
-
-
+    schema = pa.schema([("sku", pa.string())])
+    skus: list[str] = []
+    for batch in _query_batches(None, query, max_cache_age=max_cache_age):
+        # Clean SKUs before returning
+        skus.extend(_sanitize_batch(batch, schema).column("sku").to_pylist())
+    return skus
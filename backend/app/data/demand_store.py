@@ -0,0 +1,172 @@
+"""
+Local, month-partitioned Parquet store of daily demand synced incrementally
+from BigQuery.
+
+The store keeps a watermark (last synced date); each sync only queries
+days after it, re-fetching a short lookback window so late-arriving orders
+replace the partial days captured by the previous run.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+from app.data_loader import load_config
+
+STORE_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "demand_store"
+WATERMARK_FILE = "_watermark.json"
+
+
+def _store_settings() -> dict:
+    try:
+        return load_config().get("demand_store", {}) or {}
+    except Exception:
+        return {}
+
+
+def read_watermark(store_dir: Path = STORE_DIR) -> Optional[date]:
+    path = store_dir / WATERMARK_FILE
+    if not path.exists():
+        return None
+    with path.open("r") as f:
+        value = json.load(f).get("last_synced_date")
+    return date.fromisoformat(value) if value else None
+
+
+def _write_watermark(store_dir: Path, last_synced: date) -> None:
+    path = store_dir / WATERMARK_FILE
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w") as f:
+        json.dump(
+            {
+                "last_synced_date": last_synced.isoformat(),
+                "synced_at": datetime.now(timezone.utc).isoformat(),
+            },
+            f,
+            indent=2,
+        )
+    tmp_path.replace(path)
+
+
+def _partition_path(store_dir: Path, month: str) -> Path:
+    return store_dir / f"month={month}" / "part.parquet"
+
+
+def merge_into_store(df: pd.DataFrame, store_dir: Path = STORE_DIR) -> int:
+    """Upsert daily rows into their month partitions.
+
+    Every date present in `df` replaces that date's existing rows, so
+    re-running a sync over the same days is idempotent. Returns the number
+    of partitions rewritten.
+    """
+    if df.empty:
+        return 0
+
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"])
+    months = df["date"].dt.strftime("%Y-%m")
+
+    written = 0
+    for month, new_rows in df.groupby(months):
+        path = _partition_path(store_dir, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            existing = pd.read_parquet(path)
+            existing = existing[~existing["date"].isin(new_rows["date"].unique())]
+            merged = pd.concat([existing, new_rows], ignore_index=True)
+        else:
+            merged = new_rows
+        merged = merged.sort_values(["date", "sku"], kind="stable").reset_index(drop=True)
+
+        # Write then rename so readers never see a half-written partition
+        tmp_path = path.with_suffix(".parquet.tmp")
+        merged.to_parquet(tmp_path, index=False)
+        tmp_path.replace(path)
+        written += 1
+    return written
+
+
+def sync_demand_store(
+    store_dir: Path = STORE_DIR,
+    lookback_days: Optional[int] = None,
+    full: bool = False,
+    fetch: Optional[Callable[..., pd.DataFrame]] = None,
+) -> Dict[str, object]:
+    """Pull days after the watermark (minus `lookback_days`) into the store."""
+    if fetch is None:
+        from app.data.bigquery_client import fetch_demand_with_context
+
+        # Bypass the local query cache while BigQuery is reachable; a sync
+        # must see rows that arrived since the last identical query
+        fetch = partial(fetch_demand_with_context, max_cache_age=0)
+    if lookback_days is None:
+        lookback_days = int(_store_settings().get("lookback_days", 2))
+
+    store_dir.mkdir(parents=True, exist_ok=True)
+    watermark = None if full else read_watermark(store_dir)
+    start_date = None
+    if watermark is not None:
+        start_date = watermark + timedelta(days=1) - timedelta(days=lookback_days)
+
+    df = fetch(start_date=start_date)
+    partitions = merge_into_store(df, store_dir)
+
+    new_watermark = watermark
+    if not df.empty:
+        fetched_max = pd.to_datetime(df["date"]).max().date()
+        new_watermark = max(fetched_max, watermark) if watermark else fetched_max
+        _write_watermark(store_dir, new_watermark)
+
+    return {
+        "start_date": start_date.isoformat() if start_date else None,
+        "rows_fetched": int(len(df)),
+        "partitions_written": partitions,
+        "watermark": new_watermark.isoformat() if new_watermark else None,
+    }
+
+
+def load_demand_store(store_dir: Path = STORE_DIR) -> pd.DataFrame:
+    """Read every partition of the store into one date/sku-sorted frame."""
+    paths = sorted(store_dir.glob("month=*/part.parquet"))
+    if not paths:
+        return pd.DataFrame(columns=["date", "sku", "total_quantity"])
+    df = pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True)
+    df["date"] = pd.to_datetime(df["date"])
+    return df.sort_values(["date", "sku"], kind="stable").reset_index(drop=True)
+
+
+def load_demand_history(store_dir: Path = STORE_DIR, sync: bool = True) -> pd.DataFrame:
+    """Return demand history from the local store, syncing it first.
+
+    If BigQuery is unreachable the existing store is used as-is, so callers
+    keep working offline once the store has been populated.
+    """
+    if sync:
+        try:
+            sync_demand_store(store_dir)
+        except Exception:
+            logging.exception("Demand store sync failed; using local store as-is")
+    return load_demand_store(store_dir)
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incrementally sync daily demand from BigQuery.")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and resync everything.")
+    parser.add_argument("--lookback-days", type=int, default=None, help="Already-synced days to re-fetch.")
+    args = parser.parse_args()
+
+    summary = sync_demand_store(lookback_days=args.lookback_days, full=args.full)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
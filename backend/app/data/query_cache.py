@@ -0,0 +1,145 @@
+"""
+Content-addressed on-disk cache of BigQuery query results.
+
+Each result is stored as an Arrow IPC file named after a SHA-256 of the SQL
+text and its parameters, so identical queries are answered locally until
+the entry's TTL runs out. The cache directory is kept under a size cap by
+evicting the least recently used files.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+import pyarrow as pa
+
+from app.data_loader import load_config
+
+CACHE_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "query_cache"
+
+
+def query_cache_key(query: str, parameters: Sequence[object] = ()) -> str:
+    """Hash the SQL text and its (name, type, value) parameters."""
+    params = [
+        [getattr(p, "name", None), getattr(p, "type_", None), getattr(p, "value", p)]
+        for p in parameters
+    ]
+    payload = json.dumps([query.strip(), params], default=str, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QueryResultCache:
+    """Arrow files keyed by query hash, with a TTL and a total size cap."""
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_DIR,
+        ttl_seconds: float = 86400.0,
+        max_bytes: int = 1 << 30,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_bytes = int(max_bytes)
+        self._clock = clock
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.arrow"
+
+    def get(
+        self, key: str, max_age: Optional[float] = None, allow_expired: bool = False
+    ) -> Optional[pa.Table]:
+        """Return the cached table for `key`, or None if missing or expired.
+
+        `max_age` tightens the TTL for this lookup; `allow_expired` ignores
+        both and returns any entry on disk (used when BigQuery is unreachable).
+        """
+        path = self._path(key)
+        try:
+            age = self._clock() - path.stat().st_mtime
+        except OSError:
+            return None
+        ttl = self.ttl_seconds if max_age is None else min(self.ttl_seconds, max_age)
+        if age > ttl and not allow_expired:
+            return None
+        try:
+            with pa.memory_map(str(path), "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (OSError, pa.ArrowInvalid):
+            logging.warning("Discarding unreadable query cache entry %s", path.name)
+            path.unlink(missing_ok=True)
+            return None
+        # Bump atime so size-cap eviction keeps recently used entries
+        try:
+            os.utime(path, (self._clock(), path.stat().st_mtime))
+        except OSError:
+            pass
+        return table
+
+    def write_through(self, key: str, batches: Iterable[pa.RecordBatch]) -> Iterator[pa.RecordBatch]:
+        """Yield `batches` while writing them to the cache entry for `key`.
+
+        The entry only becomes visible once every batch has been written; an
+        abandoned or failed stream leaves no partial file behind.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Unique per writer: threads of one worker may fill the same key at once
+        tmp_path = self._path(key).with_suffix(f".{os.getpid()}.{uuid.uuid4().hex}.tmp")
+        writer = None
+        try:
+            for batch in batches:
+                if writer is None:
+                    writer = pa.ipc.new_file(str(tmp_path), batch.schema)
+                writer.write_batch(batch)
+                yield batch
+            if writer is not None:
+                writer.close()
+                writer = None
+                tmp_path.replace(self._path(key))
+                self._evict()
+        finally:
+            if writer is not None:
+                writer.close()
+            tmp_path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.cache_dir.glob("*.arrow"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        for path in self.cache_dir.glob("*.arrow"):
+            path.unlink(missing_ok=True)
+
+
+@lru_cache(maxsize=1)
+def get_query_cache() -> Optional[QueryResultCache]:
+    """Return the process-wide cache, or None when `bigquery.cache.enabled` is off."""
+    try:
+        cache_cfg = load_config().get("bigquery", {}).get("cache", {}) or {}
+    except Exception:
+        cache_cfg = {}
+    if not cache_cfg.get("enabled", True):
+        return None
+    return QueryResultCache(
+        ttl_seconds=cache_cfg.get("ttl_seconds", 86400),
+        max_bytes=int(cache_cfg.get("max_megabytes", 1024)) * 1024 * 1024,
+    )
@@ -1,10 +1,14 @@
+from __future__ import annotations
+
 from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, List
 
-import pandas as pd
 import yaml
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,6 +37,8 @@ def load_history_df() -> pd.DataFrame:
             "Run the offline pipeline (ingest -> features -> split -> train) first."
         )
 
+    import pandas as pd
+
     date_col = cfg["data"]["date_column"]
     df = pd.read_parquet(features_path)
     df[date_col] = pd.to_datetime(df[date_col])
@@ -1,10 +1,82 @@
 from __future__ import annotations
 
-from typing import Iterable
+from typing import Dict, Iterable
 
+import numpy as np
 import pandas as pd
 
 
+def _segments(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Series number and position within the series of each row (rows sorted by key)."""
+    n = len(keys)
+    rows = np.arange(n)
+    if n == 0:
+        return rows, rows
+    new_segment = np.empty(n, dtype=bool)
+    new_segment[0] = True
+    new_segment[1:] = keys[1:] != keys[:-1]
+    segment_start = np.maximum.accumulate(np.where(new_segment, rows, 0))
+    return np.cumsum(new_segment) - 1, rows - segment_start
+
+
+def lag_rolling_features(
+    keys: np.ndarray,
+    values: np.ndarray,
+    lags: Iterable[int],
+    rolling_mean_windows: Iterable[int],
+) -> Dict[str, np.ndarray]:
+    """Per-series lags and trailing rolling means in one pass over sorted arrays.
+
+    `keys`/`values` must be sorted by series then time. Lag k of a row is
+    the value k rows earlier in the same series; rolling mean w is the mean
+    of the previous w values of the series (the current value excluded),
+    NaN until w values exist or while any of them is NaN. This matches
+    `groupby(key).shift(1).rolling(w).mean()` applied series by series.
+
+    Window sums are differences of a running sum that restarts at every
+    series, so they are exact for integer-valued targets and otherwise
+    carry rounding error that grows with the series' own history only,
+    not with the series sorted before it. Shared by the app and the
+    pipeline scripts (src/features.py).
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    segment, position = _segments(np.asarray(keys))
+
+    missing = np.isnan(values)
+    # before[i]: sum of the series' values in the rows before i
+    running = (
+        pd.Series(np.where(missing, 0.0, values))
+        .groupby(segment, sort=False)
+        .cumsum()
+        .to_numpy()
+    )
+    before = np.zeros(n)
+    before[1:] = running[:-1]
+    before[position == 0] = 0.0
+    cmissing = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(missing, out=cmissing[1:])
+
+    features: Dict[str, np.ndarray] = {}
+    for lag in lags:
+        out = np.full(n, np.nan)
+        if lag < n:
+            out[lag:] = values[: n - lag]
+        out[position < lag] = np.nan
+        features[f"lag_{lag}"] = out
+
+    for window in rolling_mean_windows:
+        out = np.full(n, np.nan)
+        if window < n:
+            # Row i averages rows [i - window, i)
+            out[window:] = (before[window:] - before[: n - window]) / window
+            incomplete = cmissing[window:n] != cmissing[: n - window]
+            out[window:][incomplete] = np.nan
+        out[position < window] = np.nan
+        features[f"rolling_mean_{window}"] = out
+    return features
+
+
 def build_time_series_features(
     df: pd.DataFrame,
     lags: Iterable[int] = (7, 14, 28),
@@ -23,21 +95,14 @@ def build_time_series_features(
     df["date"] = pd.to_datetime(df["date"])
     df = df.sort_values(["sku", "date"])
 
-    for lag in lags:
-        df[f"lag_{lag}"] = (
-            df.groupby("sku")["total_quantity"]
-            .shift(lag)
-            .astype(float)
-        )
-
-    for window in rolling_windows:
-        df[f"rolling_mean_{window}"] = (
-            df.groupby("sku")["total_quantity"]
-            .shift(1)
-            .rolling(window=window)
-            .mean()
-            .astype(float)
-        )
+    features = lag_rolling_features(
+        df["sku"].to_numpy(),
+        df["total_quantity"].to_numpy(dtype=float),
+        lags,
+        rolling_windows,
+    )
+    for name, values in features.items():
+        df[name] = values
 
     # Calendar features
     df["day_of_week"] = df["date"].dt.dayofweek.astype(int)
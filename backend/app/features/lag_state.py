@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+
+
+class LagState:
+    """Fixed-size ring buffer of recent targets for a batch of series.
+
+    Holds the last `capacity` values of each series together with running
+    sums for every rolling window, so reading a lag or a rolling mean and
+    pushing the next value are O(1) per feature with no re-allocation.
+
+    NaN entries (e.g. left padding for short histories) are treated as
+    missing: rolling means average over the observed values only.
+    """
+
+    def __init__(
+        self,
+        history: np.ndarray,
+        lags: Iterable[int] = (),
+        rolling_windows: Iterable[int] = (),
+        capacity: int = 0,
+    ):
+        history = np.atleast_2d(np.asarray(history, dtype=float))
+        self.lags = sorted(set(int(lag) for lag in lags))
+        self.rolling_windows = sorted(set(int(w) for w in rolling_windows))
+        self.capacity = max([capacity, 1] + self.lags + self.rolling_windows)
+
+        n = history.shape[0]
+        self._buf = np.full((n, self.capacity), np.nan)
+        tail = history[:, -self.capacity :]
+        self._buf[:, self.capacity - tail.shape[1] :] = tail
+        # Index of the slot the next pushed value will occupy (oldest value)
+        self._pos = 0
+
+        observed = ~np.isnan(self._buf)
+        filled = np.where(observed, self._buf, 0.0)
+        self._sums = {w: filled[:, -w:].sum(axis=1) for w in self.rolling_windows}
+        self._counts = {w: observed[:, -w:].sum(axis=1) for w in self.rolling_windows}
+
+    def lag(self, k: int) -> np.ndarray:
+        """Value observed `k` steps before the next one to be pushed."""
+        return self._buf[:, (self._pos - k) % self.capacity]
+
+    def rolling_mean(self, window: int) -> np.ndarray:
+        counts = self._counts[window]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, self._sums[window] / counts, np.nan)
+
+    def push(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=float)
+        observed = ~np.isnan(values)
+        filled = np.where(observed, values, 0.0)
+        for w in self.rolling_windows:
+            leaving = self.lag(w)
+            left = ~np.isnan(leaving)
+            self._sums[w] += filled - np.where(left, leaving, 0.0)
+            self._counts[w] += observed.astype(int) - left.astype(int)
+        self._buf[:, self._pos] = values
+        self._pos = (self._pos + 1) % self.capacity
@@ -1,24 +1,68 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from pathlib import Path
+import json
 import os
-from typing import List
+import sys
+from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-
-from app.services.forecasting import forecast_sku, list_skus
-from app.services.llm import summarize_forecast
-from pathlib import Path
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+# The forecasting stack (pandas, numpy, the model artifact) is imported
+# inside the endpoints that need it, so importing this module stays cheap;
+# see app.services.startup for how it is warmed.
+from app.services.sku_catalogue import get_sku_catalogue
+from app.services.inference_pool import PoolSaturatedError, get_inference_pool
+from app.services.startup import start_warm_up, startup_mode, startup_state, warm_up
+from app.services.serialization import (
+    ARROW_STREAM_MEDIA_TYPE,
+    FastJSONResponse,
+    arrow_forecast_stream,
+    dumps,
+    forecast_payload,
+    forecast_points,
+)
 from .data_loader import load_config
 from .schemas import (
-    ForecastPoint,
+    BatchForecastRequest,
+    BatchForecastResponse,
     ForecastResponse,
     HealthResponse,
     MetricsResponse,
+    ReadinessResponse,
     SKUsResponse,
     ExecutivePulseResponse,
 )
 
-app = FastAPI(title="Demand Forecasting API", version="1.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the model artifact according to `serving.startup_mode`.
+
+    - background (default): start serving at once and load the artifact on
+      a daemon thread; /ready reports 503 until it is done.
+    - eager: load before accepting requests.
+    - lazy: skip warm-up; the first forecast request loads the artifact.
+    """
+    mode = startup_mode()
+    startup_state.mode = mode
+    if mode == "eager":
+        warm_up()
+    elif mode == "background":
+        start_warm_up()
+    else:
+        startup_state.mark_ready()
+    yield
+    if get_inference_pool.cache_info().currsize:
+        get_inference_pool().shutdown()
+
+
+app = FastAPI(title="Demand Forecasting API", version="1.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,38 +73,69 @@ app.add_middleware(
 )
 
 
+async def run_inference(fn, *args, **kwargs):
+    """Run CPU-bound work on the inference pool, shedding load with a 503."""
+    try:
+        return await get_inference_pool().run(fn, *args, **kwargs)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
 @app.get("/health", response_model=HealthResponse)
 def health() -> HealthResponse:
     return HealthResponse(status="ok")
 
 
-@app.get("/skus", response_model=SKUsResponse)
-def get_skus() -> SKUsResponse:
-    # Prefer a live BigQuery-backed SKU list when available to avoid
-    # returning potentially stale values coming from the fallback artifact.
-    try:
-        from app.data.bigquery_client import list_skus as bq_list_skus
+@app.get("/ready", response_model=ReadinessResponse)
+def ready():
+    """Readiness probe: 200 once the artifact is warm, 503 while warming or failed.
 
-        skus = bq_list_skus()
-    except Exception:
-        try:
-            # Fall back to the artifact-backed SKU list if BigQuery isn't reachable
-            skus = list_skus()
-        except Exception:
-            skus = []
+    The body reports the startup mode and import/load timings in seconds.
+    A failed warm-up is retried in the background on the next probe.
+    """
+    snapshot = startup_state.snapshot()
+    if snapshot["status"] == "ready":
+        return snapshot
+    if snapshot["status"] == "failed":
+        start_warm_up()
+    return JSONResponse(status_code=503, content=snapshot)
 
-    # Deduplicate SKUs while preserving order to avoid duplicate option keys
-    try:
-        seen = set()
-        unique = []
-        for s in skus:
-            if s not in seen:
-                seen.add(s)
-                unique.append(s)
-    except Exception:
-        unique = skus
 
-    return SKUsResponse(skus=unique)
+@app.get("/skus", response_model=SKUsResponse)
+def get_skus(
+    response: Response,
+    q: Optional[str] = None,
+    match: str = "prefix",
+    offset: int = 0,
+    limit: Optional[int] = None,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """List known SKUs, optionally filtered by `q` (prefix or substring match).
+
+    Served from an in-memory catalogue that refreshes in the background.
+    Results are paginated with `offset`/`limit`; `total` is the number of
+    matches before pagination. Clients can revalidate with If-None-Match.
+    """
+    if match not in ("prefix", "substring"):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid match '{match}'. Allowed: ['prefix', 'substring']",
+        )
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="offset and limit must be non-negative")
+
+    registry, etag = get_sku_catalogue().get()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    if q:
+        matches = registry.search(q, match=match)
+        total = len(matches)
+        end = None if limit is None else offset + limit
+        return SKUsResponse(skus=matches[offset:end], total=total)
+    return SKUsResponse(skus=registry.page(offset, limit), total=len(registry))
 
 
 @app.get("/metrics", response_model=MetricsResponse)
@@ -74,8 +149,6 @@ def get_metrics() -> MetricsResponse:
             detail="Metrics not found. Run evaluation step to generate metrics.",
         )
 
-    import json
-
     with metrics_path.open("r") as f:
         data = json.load(f)
 
@@ -83,7 +156,11 @@ def get_metrics() -> MetricsResponse:
 
 
 @app.get("/forecast/{sku}", response_model=ForecastResponse)
-def get_forecast(sku: str, horizon: int = 14) -> ForecastResponse:
+async def get_forecast(
+    sku: str,
+    horizon: int = 14,
+    accept: Optional[str] = Header(default=None),
+):
     """
     Return forecast for a given SKU and horizon.
     The response shape is compatible with the existing Next.js dashboard:
@@ -92,6 +169,8 @@ def get_forecast(sku: str, horizon: int = 14) -> ForecastResponse:
         "horizon": 14,
         "data": [{ "date": "YYYY-MM-DD", "actual": null, "forecast": 123 }]
       }
+    Send `Accept: application/vnd.apache.arrow.stream` to receive the
+    (sku, date, forecast) columns as an Arrow IPC stream instead.
     """
     allowed_horizons: List[int] = [7, 14, 30]
     if horizon not in allowed_horizons:
@@ -100,50 +179,147 @@ def get_forecast(sku: str, horizon: int = 14) -> ForecastResponse:
             detail=f"Invalid horizon {horizon}. Allowed: {allowed_horizons}",
         )
 
-    skus = list_skus()
-    if sku not in skus:
+    as_arrow = ARROW_STREAM_MEDIA_TYPE in (accept or "")
+    return await run_inference(_forecast_response, sku, horizon, as_arrow)
+
+
+def _forecast_response(sku: str, horizon: int, as_arrow: bool = False) -> Response:
+    from app.services.forecasting import forecast_sku, get_sku_registry
+
+    if sku not in get_sku_registry():
         raise HTTPException(status_code=404, detail=f"Unknown SKU '{sku}'.")
 
     forecast_df = forecast_sku(sku=sku, horizon=horizon)
 
-    points: List[ForecastPoint] = []
-    for _, row in forecast_df.iterrows():
-        points.append(
-            ForecastPoint(
-                date=row["date"].date().isoformat(),
-                actual=None,
-                forecast=float(row["forecast"]),
-            )
+    # Serialize straight from the forecast columns rather than building one
+    # pydantic ForecastPoint per row; the shape still matches ForecastResponse.
+    if as_arrow:
+        return Response(
+            content=arrow_forecast_stream(forecast_df), media_type=ARROW_STREAM_MEDIA_TYPE
+        )
+    return FastJSONResponse(forecast_payload(sku, horizon, forecast_df))
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+BATCH_CHUNK_SIZE = 512
+
+
+def _split_known_skus(skus: List[str]) -> tuple[List[str], List[str]]:
+    from app.services.forecasting import get_sku_registry
+
+    known = get_sku_registry()
+    requested = list(dict.fromkeys(str(s) for s in skus))
+    return (
+        [s for s in requested if s in known],
+        [s for s in requested if s not in known],
+    )
+
+
+def _batch_records(forecast_df, horizon: int) -> List[dict]:
+    """Group a long (date, sku, forecast) frame into one record per SKU."""
+    skus = forecast_df["sku"].tolist()
+    points = forecast_points(forecast_df)
+    return [
+        {"sku": skus[start], "horizon": horizon, "data": points[start : start + horizon]}
+        for start in range(0, len(skus), horizon)
+    ]
+
+
+@app.post("/forecast/batch", response_model=BatchForecastResponse)
+async def post_forecast_batch(
+    request: BatchForecastRequest,
+    accept: Optional[str] = Header(default=None),
+):
+    """
+    Forecast many SKUs in one round trip.
+
+    Responds with JSON by default. Send `Accept: application/x-ndjson` to
+    stream one JSON record per SKU as chunks complete, or
+    `Accept: application/vnd.apache.arrow.stream` for a long
+    (sku, date, forecast) Arrow IPC stream. Unknown SKUs are reported
+    rather than failing the whole batch.
+    """
+    horizon = request.horizon
+    allowed_horizons: List[int] = [7, 14, 30]
+    if horizon not in allowed_horizons:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid horizon {horizon}. Allowed: {allowed_horizons}",
+        )
+    max_skus = load_config().get("serving", {}).get("max_batch_skus", 10000)
+    if len(request.skus) > max_skus:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many SKUs ({len(request.skus)}). Maximum per batch: {max_skus}",
+        )
+
+    from app.services.forecasting import forecast_skus
+
+    known, missing = await run_inference(_split_known_skus, request.skus)
+    accept = accept or ""
+
+    if NDJSON_MEDIA_TYPE in accept:
+        # Claim pool capacity for the first chunk before committing to a 200
+        first = await run_inference(forecast_skus, known[:BATCH_CHUNK_SIZE], horizon)
+
+        async def stream():
+            forecast_df = first
+            start = BATCH_CHUNK_SIZE
+            while True:
+                for record in _batch_records(forecast_df, horizon):
+                    yield dumps(record) + b"\n"
+                chunk = known[start : start + BATCH_CHUNK_SIZE]
+                if not chunk:
+                    break
+                try:
+                    forecast_df = await get_inference_pool().run(forecast_skus, chunk, horizon)
+                except PoolSaturatedError as e:
+                    yield dumps({"error": str(e), "unprocessed": known[start:]}) + b"\n"
+                    return
+                start += BATCH_CHUNK_SIZE
+            for sku in missing:
+                yield dumps({"sku": sku, "horizon": horizon, "error": f"Unknown SKU '{sku}'."}) + b"\n"
+
+        return StreamingResponse(stream(), media_type=NDJSON_MEDIA_TYPE)
+
+    forecast_df = await run_inference(forecast_skus, known, horizon)
+
+    if ARROW_STREAM_MEDIA_TYPE in accept:
+        body = await run_inference(
+            arrow_forecast_stream, forecast_df, {"missing_skus": json.dumps(missing)}
         )
+        return Response(content=body, media_type=ARROW_STREAM_MEDIA_TYPE)
 
-    # Indicate whether the server is using the fallback artifact via header
-    return ForecastResponse(sku=sku, horizon=horizon, data=points)
+    records = await run_inference(_batch_records, forecast_df, horizon)
+    return FastJSONResponse({"horizon": horizon, "forecasts": records, "missing": missing})
 
 
 @app.get("/model/status")
 def model_status():
-    """Return whether a trained artifact is present and whether fallback is active."""
-    try:
-        from app.services.forecasting import MODEL_PATH
-        import importlib
-
-        using_fallback = False
-        if not Path(MODEL_PATH).exists():
-            using_fallback = True
-        else:
-            # If sklearn can't be imported, we likely can't unpickle the real model
-            try:
-                importlib.import_module("sklearn")
-            except Exception:
-                using_fallback = True
+    """Return which model backend serves forecasts and whether it is the fallback.
 
-        return {"using_fallback": using_fallback}
-    except Exception:
-        return {"using_fallback": True}
+    Reflects the artifact that was actually loaded, so a LightGBM model
+    served through its NumPy tree export is not reported as fallback.
+    Until an artifact has loaded, reports "loading" (or "failed" with the
+    warm-up error) instead of loading it from the probe.
+    """
+    # Only consult the forecasting module if something already imported it
+    forecasting = sys.modules.get("app.services.forecasting")
+    status = forecasting.model_status() if forecasting is not None else None
+    if status is None:
+        snapshot = startup_state.snapshot()
+        return {
+            "status": "failed" if snapshot["status"] == "failed" else "loading",
+            "using_fallback": None,
+            "backend": None,
+            "version": None,
+            "error": snapshot["error"],
+        }
+    return {"status": "loaded", **status}
 
 
 @app.get("/llm/summary/{sku}")
-def get_llm_summary(sku: str, horizon: int = 14):
+async def get_llm_summary(sku: str, horizon: int = 14):
     """Return an LLM-generated summary for a SKU forecast."""
     allowed_horizons: List[int] = [7, 14, 30]
     if horizon not in allowed_horizons:
@@ -153,8 +329,9 @@ def get_llm_summary(sku: str, horizon: int = 14):
         )
 
     try:
-        # Do not call list_skus() (this may load model artifact). Attempt to forecast directly.
-        forecast_df = forecast_sku(sku=sku, horizon=horizon)
+        forecast_df = await get_inference_pool().run(_forecast_known_sku, sku, horizon)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except FileNotFoundError as e:
         raise HTTPException(status_code=503, detail=str(e))
     except ModuleNotFoundError as e:
@@ -171,15 +348,15 @@ def get_llm_summary(sku: str, horizon: int = 14):
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Forecast generation failed: {e}")
 
-    points = []
     try:
-        for _, row in forecast_df.iterrows():
-            points.append({"date": row["date"].date().isoformat(), "forecast": float(row["forecast"])})
+        points = forecast_points(forecast_df, include_actual=False)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Invalid forecast data: {e}")
 
     try:
-        summary = summarize_forecast(sku, points)
+        from app.services.llm import summarize_forecast_async
+
+        summary = await summarize_forecast_async(sku, points)
     except Exception as e:
         # summarize_forecast should handle its own errors, but guard here too
         raise HTTPException(status_code=502, detail=f"LLM summary failed: {e}")
@@ -187,6 +364,15 @@ def get_llm_summary(sku: str, horizon: int = 14):
     return {"summary": summary}
 
 
+def _forecast_known_sku(sku: str, horizon: int):
+    from app.services.forecasting import forecast_sku, get_sku_registry
+
+    # Registry membership is a set lookup once the artifact is loaded
+    if sku not in get_sku_registry():
+        raise ValueError(f"No history found for SKU '{sku}'.")
+    return forecast_sku(sku=sku, horizon=horizon)
+
+
 @app.get("/internal/llm/probe")
 def internal_llm_probe():
     """Internal diagnostic endpoint to probe the configured OpenAI model.
@@ -200,35 +386,52 @@ def internal_llm_probe():
         raise HTTPException(status_code=500, detail="LLM probe failed")
 
 
+@app.get("/internal/cache/stats")
+def internal_cache_stats():
+    """Internal diagnostic endpoint reporting forecast cache hit/miss counters."""
+    from app.services.forecasting import forecast_cache_stats
+
+    return {
+        "forecast": forecast_cache_stats(),
+        "inference_pool": get_inference_pool().stats(),
+    }
+
+
 @app.get("/overview")
-def get_overview(horizon: int = 14):
+async def get_overview(horizon: int = 14):
     """Return executive overview KPIs and aggregate time series."""
     try:
         from app.services.overview import compute_overview
 
-        return compute_overview(horizon=horizon)
+        return FastJSONResponse(await run_inference(compute_overview, horizon=horizon))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Overview generation failed: {e}")
 
 
 @app.get("/executive/pulse", response_model=ExecutivePulseResponse)
-def get_executive_pulse(horizon: int = 14):
+async def get_executive_pulse(horizon: int = 14):
     """Return high-level executive KPIs for the dashboard Pulse panel."""
     try:
         from app.services.executive import compute_pulse
 
-        return compute_pulse(horizon=horizon)
+        return await run_inference(compute_pulse, horizon=horizon)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Executive pulse generation failed: {e}")
 
 
 @app.get("/sku_health")
-def get_sku_health(horizon: int = 14):
+async def get_sku_health(horizon: int = 14):
     """Return per-SKU health metrics for the dashboard to consume."""
     try:
         from app.services.overview import compute_sku_health
 
-        return compute_sku_health(horizon=horizon)
+        return FastJSONResponse(await run_inference(compute_sku_health, horizon=horizon))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"SKU health generation failed: {e}")
 
@@ -264,3 +467,5 @@ def trigger_training():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+startup_state.record("import_app_main", time.perf_counter() - _IMPORT_STARTED)
@@ -8,6 +8,8 @@ import numpy as np
 import pandas as pd
 
 from .data_loader import load_config, load_history_df
+from .features.lag_state import LagState
+from .services.predictor import make_predictor
 
 
 @lru_cache(maxsize=1)
@@ -61,15 +63,16 @@ def iterative_forecast_for_sku(
     le = artifact["sku_label_encoder"]
     encoded_sku = le.transform([sku])[0]
 
-    recent_targets = list(
-        sku_history.sort_values(by=[date_col])[target_col].values[
-            -max(lags + rolling_windows) :
-        ]
+    # Ring buffer of recent targets with running window sums
+    state = LagState(
+        sku_history[target_col].to_numpy(dtype=float),
+        lags=lags,
+        rolling_windows=rolling_windows,
     )
 
     future_records: List[Dict] = []
     feature_cols: List[str] = artifact["feature_cols"]
-    model = artifact["model"]
+    predictor = make_predictor(artifact["model"])
 
     for step in range(1, horizon + 1):
         forecast_date = last_date + timedelta(days=step)
@@ -81,22 +84,17 @@ def iterative_forecast_for_sku(
         feature_row[sku_col] = encoded_sku
 
         for lag in lags:
-            feature_row[f"{target_col}_lag_{lag}"] = recent_targets[-lag]
+            feature_row[f"{target_col}_lag_{lag}"] = float(state.lag(lag)[0])
 
         for window in rolling_windows:
-            if len(recent_targets) >= window:
-                feature_row[f"{target_col}_rolling_mean_{window}"] = float(
-                    np.mean(recent_targets[-window:])
-                )
-            else:
-                feature_row[f"{target_col}_rolling_mean_{window}"] = float(
-                    np.mean(recent_targets)
-                )
+            feature_row[f"{target_col}_rolling_mean_{window}"] = float(
+                state.rolling_mean(window)[0]
+            )
 
         X_input = np.array([[feature_row[col] for col in feature_cols]])
-        y_pred = float(model.predict(X_input)[0])
+        y_pred = float(predictor.predict_matrix(X_input)[0])
 
-        recent_targets.append(y_pred)
+        state.push([y_pred])
         future_records.append(
             {
                 date_col: forecast_date,
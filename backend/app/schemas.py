@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -7,6 +7,13 @@ class HealthResponse(BaseModel):
     status: str
 
 
+class ReadinessResponse(BaseModel):
+    status: str
+    mode: str
+    error: Optional[str] = None
+    timings: Dict[str, float] = {}
+
+
 class ForecastPoint(BaseModel):
     date: str
     actual: Optional[float] = None
@@ -19,6 +26,17 @@ class ForecastResponse(BaseModel):
     data: List[ForecastPoint]
 
 
+class BatchForecastRequest(BaseModel):
+    skus: List[str]
+    horizon: int = 14
+
+
+class BatchForecastResponse(BaseModel):
+    horizon: int
+    forecasts: List[ForecastResponse]
+    missing: List[str] = []
+
+
 class MetricsResponse(BaseModel):
     MAE: float
     RMSE: float
@@ -27,12 +45,13 @@ class MetricsResponse(BaseModel):
 
 class SKUsResponse(BaseModel):
     skus: List[str]
+    total: Optional[int] = None
 
 
 class ExecutivePulsePoint(BaseModel):
     date: str
-    actual: Optional[float]
-    forecast: Optional[float]
+    actual: Optional[float] = None
+    forecast: Optional[float] = None
 
 
 class ExecutivePulseResponse(BaseModel):
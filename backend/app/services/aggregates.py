@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .forecasting import load_artifact
+
+
+RECENT_WINDOW_DAYS = 90
+
+
+@dataclass(frozen=True)
+class RecentAggregates:
+    """Materialized recent-window statistics shared by the dashboard endpoints.
+
+    `sku_stats` is indexed by SKU (sorted) with columns avg, std, count and
+    volatility; `daily` holds total quantity per date (sorted).
+    """
+
+    end: Optional[pd.Timestamp]
+    daily: pd.DataFrame
+    sku_stats: pd.DataFrame
+    avg_price: float
+
+    @property
+    def empty(self) -> bool:
+        return self.end is None
+
+
+def compute_recent_aggregates(
+    history_df: pd.DataFrame, window_days: int = RECENT_WINDOW_DAYS
+) -> RecentAggregates:
+    """Compute per-SKU and per-day aggregates over the last `window_days`.
+
+    Groups are factorized once and reduced with `np.bincount`, so the whole
+    window is scanned a fixed number of times regardless of SKU count.
+    """
+    dates = pd.to_datetime(history_df["date"])
+    # Series.max skips NaT, like the groupby this replaced
+    end = dates.max()
+    if history_df.empty or pd.isna(end):
+        return RecentAggregates(
+            end=None,
+            daily=pd.DataFrame({"date": pd.Series(dtype="datetime64[ns]"), "total_quantity": pd.Series(dtype=float)}),
+            sku_stats=pd.DataFrame(columns=["avg", "std", "count", "volatility"], dtype=float),
+            avg_price=1.0,
+        )
+
+    dates = dates.to_numpy()
+    end = pd.Timestamp(end).to_datetime64()
+    # NaT compares False, so rows without a date fall out of the window
+    in_window = dates >= end - np.timedelta64(window_days, "D")
+    quantity = history_df["total_quantity"].to_numpy(dtype=float)[in_window]
+    # Match pandas groupby semantics: missing quantities are skipped
+    observed = ~np.isnan(quantity)
+    filled = np.where(observed, quantity, 0.0)
+
+    # Mask before converting so a categorical SKU column only expands the window
+    sku_codes, skus = pd.factorize(history_df["sku"][in_window].to_numpy(), sort=True)
+    # Rows without a SKU (code -1) are left out of the per-SKU stats, as
+    # groupby("sku") drops them, but still count towards the daily totals
+    has_sku = sku_codes >= 0
+    sku_codes, sku_quantity = sku_codes[has_sku], quantity[has_sku]
+    sku_observed, sku_filled = observed[has_sku], filled[has_sku]
+    n_skus = len(skus)
+    counts = np.bincount(sku_codes, weights=sku_observed, minlength=n_skus)
+    sums = np.bincount(sku_codes, weights=sku_filled, minlength=n_skus)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg = sums / counts
+        deviations = np.where(sku_observed, sku_quantity - avg[sku_codes], 0.0)
+        sq = np.bincount(sku_codes, weights=deviations**2, minlength=n_skus)
+        std = np.where(counts > 1, np.sqrt(sq / (counts - 1)), 0.0)
+        volatility = std / (avg + 1e-9)
+    volatility[~np.isfinite(volatility)] = 0.0
+
+    sku_stats = pd.DataFrame(
+        {"avg": avg, "std": std, "count": counts, "volatility": volatility},
+        index=pd.Index(skus, name="sku"),
+    )
+
+    date_codes, unique_dates = pd.factorize(dates[in_window], sort=True)
+    daily = pd.DataFrame(
+        {
+            "date": unique_dates,
+            "total_quantity": np.bincount(date_codes, weights=filled, minlength=len(unique_dates)),
+        }
+    )
+
+    avg_price = 1.0
+    if "price" in history_df.columns:
+        prices = history_df["price"].dropna()
+        if not prices.empty:
+            avg_price = float(prices.mean())
+
+    return RecentAggregates(
+        end=pd.Timestamp(end), daily=daily, sku_stats=sku_stats, avg_price=avg_price
+    )
+
+
+_lock = threading.Lock()
+
+
+def get_recent_aggregates() -> RecentAggregates:
+    """Return the aggregates for the loaded artifact, computing them on first use.
+
+    They are stored on the artifact itself, so a new artifact version gets
+    fresh aggregates and the old ones are released with it.
+    """
+    artifact = load_artifact()
+    aggregates = artifact.get("recent_aggregates")
+    if aggregates is None:
+        with _lock:
+            aggregates = artifact.get("recent_aggregates")
+            if aggregates is None:
+                aggregates = compute_recent_aggregates(artifact["history_df"])
+                artifact["recent_aggregates"] = aggregates
+    return aggregates
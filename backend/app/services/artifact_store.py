@@ -0,0 +1,296 @@
+"""
+Versioned on-disk layout for the demand model artifact.
+
+    models/demand_model/
+      LATEST                   name of the current version directory
+      <version>/
+        manifest.json          feature layout, model format, metrics
+        model.txt              LightGBM model in its native text format
+        trees.npz              the same trees as flat arrays (tree_export)
+        encoders.json          label encoder classes
+        history.arrow          history frame as an uncompressed Arrow file
+        shared/                memory-mapped serving snapshot (shared_artifact)
+
+Nothing is pickled: the model loads through LightGBM itself, the encoders
+are plain JSON, and the history is memory-mapped so workers on one host
+share its pages through the OS cache instead of each unpickling a copy.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.data_loader import load_config
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ARTIFACT_DIR = Path(__file__).resolve().parent.parent / "models" / "demand_model"
+LATEST_FILE = "LATEST"
+MANIFEST_FILE = "manifest.json"
+MODEL_FILE = "model.txt"
+ENCODERS_FILE = "encoders.json"
+HISTORY_FILE = "history.arrow"
+FORMAT_VERSION = 1
+
+
+class JsonLabelEncoder:
+    """Label encoder whose state is just its list of classes.
+
+    Codes are positions in `classes_`, which matches sklearn's LabelEncoder
+    (sorted classes) and the fallback encoder (first-seen order). Unknown
+    labels raise ValueError like sklearn unless `unknown_value` is set.
+    """
+
+    def __init__(self, classes: Sequence[str], unknown_value: Optional[int] = None):
+        self.classes_ = np.asarray([str(c) for c in classes], dtype=object)
+        self.unknown_value = unknown_value
+        self._codes = {c: i for i, c in enumerate(self.classes_)}
+
+    @classmethod
+    def from_encoder(cls, encoder: Any) -> "JsonLabelEncoder":
+        """Convert a fitted sklearn LabelEncoder or the fallback SimpleEncoder."""
+        if isinstance(encoder, cls):
+            return encoder
+        if hasattr(encoder, "classes_"):
+            return cls(list(encoder.classes_))
+        if hasattr(encoder, "_map"):
+            return cls(list(encoder._map), unknown_value=0)
+        raise TypeError(f"Cannot serialize encoder of type {type(encoder).__name__}")
+
+    def transform(self, items: Iterable[object]) -> List[int]:
+        codes = []
+        for item in items:
+            code = self._codes.get(str(item), self.unknown_value)
+            if code is None:
+                raise ValueError(f"y contains previously unseen labels: '{item}'")
+            codes.append(code)
+        return codes
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"classes": self.classes_.tolist(), "unknown_value": self.unknown_value}
+
+    @classmethod
+    def from_json(cls, payload: Dict[str, Any]) -> "JsonLabelEncoder":
+        return cls(payload["classes"], unknown_value=payload.get("unknown_value"))
+
+
+def _keep_versions() -> int:
+    try:
+        return int(load_config().get("artifact", {}).get("keep_versions", 3))
+    except Exception:
+        return 3
+
+
+def latest_version_dir(base_dir: Path = ARTIFACT_DIR) -> Optional[Path]:
+    """Return the directory LATEST points at, or None if there is none."""
+    try:
+        name = (base_dir / LATEST_FILE).read_text().strip()
+    except OSError:
+        return None
+    path = base_dir / name
+    return path if name and (path / MANIFEST_FILE).exists() else None
+
+
+def _write_history(history_df: "pd.DataFrame", path: Path) -> None:
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(history_df, preserve_index=False)
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def save_artifact(
+    model: Any,
+    feature_cols: List[str],
+    sku_encoder: Any,
+    history_df: "pd.DataFrame",
+    metadata: Optional[Dict[str, Any]] = None,
+    fallback: bool = False,
+    base_dir: Path = ARTIFACT_DIR,
+) -> Path:
+    """Write a new artifact version and point LATEST at it.
+
+    `model` is a fitted LGBMRegressor or lightgbm Booster; it is ignored
+    for fallback artifacts, which are served by exponential smoothing.
+    The version is assembled in a temporary directory and renamed into
+    place, so readers never observe a partial version. Older versions
+    beyond `artifact.keep_versions` are removed.
+    """
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    base_dir.mkdir(parents=True, exist_ok=True)
+    tmp_dir = base_dir / f".{version}.tmp"
+    tmp_dir.mkdir()
+
+    model_format = "fallback"
+    tree_export = None
+    if not fallback:
+        from app.services.tree_export import TREES_FILE, export_trees
+
+        booster = getattr(model, "booster_", model)
+        booster.save_model(str(tmp_dir / MODEL_FILE))
+        model_format = "lightgbm"
+        try:
+            export_trees(booster, tmp_dir / TREES_FILE)
+            tree_export = TREES_FILE
+        except NotImplementedError as e:
+            logging.warning("Skipping NumPy tree export: %s", e)
+
+    with (tmp_dir / ENCODERS_FILE).open("w") as f:
+        json.dump({"sku_encoder": JsonLabelEncoder.from_encoder(sku_encoder).to_json()}, f)
+    _write_history(history_df, tmp_dir / HISTORY_FILE)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "model_format": model_format,
+        "feature_cols": list(feature_cols),
+        "tree_export": tree_export,
+        "history_rows": int(len(history_df)),
+        **(metadata or {}),
+    }
+    with (tmp_dir / MANIFEST_FILE).open("w") as f:
+        json.dump(manifest, f, indent=2)
+
+    from app.services.shared_artifact import publish_shared_artifact, shared_artifact_enabled
+
+    if shared_artifact_enabled():
+        from app.services.history_index import HistoryIndex
+
+        publish_shared_artifact(tmp_dir, index=HistoryIndex(history_df))
+
+    version_dir = base_dir / version
+    tmp_dir.replace(version_dir)
+    latest_tmp = base_dir / f"{LATEST_FILE}.tmp"
+    latest_tmp.write_text(version)
+    latest_tmp.replace(base_dir / LATEST_FILE)
+
+    _prune_versions(base_dir, keep=_keep_versions(), current=version)
+    return version_dir
+
+
+def _prune_versions(base_dir: Path, keep: int, current: str) -> None:
+    versions = sorted(
+        p for p in base_dir.iterdir() if p.is_dir() and not p.name.startswith(".")
+    )
+    for path in versions[: max(len(versions) - keep, 0)]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def update_manifest(version_dir: Path, **changes: Any) -> Dict[str, Any]:
+    """Merge `changes` into a saved version's manifest (written via tmp + rename)."""
+    with (version_dir / MANIFEST_FILE).open("r") as f:
+        manifest = json.load(f)
+    manifest.update(changes)
+    tmp_path = version_dir / f".{MANIFEST_FILE}.tmp"
+    with tmp_path.open("w") as f:
+        json.dump(manifest, f, indent=2)
+    tmp_path.replace(version_dir / MANIFEST_FILE)
+    return manifest
+
+
+def read_history(version_dir: Path) -> "pd.DataFrame":
+    """Memory-map the history Arrow file and expose it as a DataFrame."""
+    import pyarrow as pa
+
+    source = pa.memory_map(str(version_dir / HISTORY_FILE), "r")
+    table = pa.ipc.open_file(source).read_all()
+    # split_blocks keeps null-free numeric columns as views over the mapping
+    return table.to_pandas(split_blocks=True)
+
+
+def _model_backend() -> str:
+    try:
+        backend = load_config().get("serving", {}).get("model_backend", "auto")
+    except Exception:
+        backend = "auto"
+    return backend if backend in ("auto", "lightgbm", "numpy") else "auto"
+
+
+def _load_model(
+    version_dir: Path, manifest: Dict[str, Any], shared: bool = False
+) -> tuple[Any, str]:
+    """Load the trained model with the configured backend.
+
+    `auto` uses LightGBM when it is installed and the exported NumPy trees
+    otherwise; `numpy` prefers the trees so serving images can omit
+    LightGBM entirely; `lightgbm` never uses them. Raises
+    ModuleNotFoundError if no allowed backend is usable. With `shared`, the
+    tree arrays are the memory-mapped copies under `shared/`.
+    """
+    from app.services.tree_export import NumpyTreeEnsemble
+
+    trees = manifest.get("tree_export")
+    backend = _model_backend()
+
+    def numpy_trees() -> NumpyTreeEnsemble:
+        if shared:
+            from app.services.shared_artifact import attach_tree_arrays
+
+            arrays = attach_tree_arrays(version_dir)
+            if arrays is not None:
+                return NumpyTreeEnsemble(arrays)
+        return NumpyTreeEnsemble.load(version_dir / trees)
+
+    if backend == "numpy" and trees:
+        return numpy_trees(), "numpy"
+    try:
+        import lightgbm as lgb
+    except ModuleNotFoundError:
+        if not trees or backend == "lightgbm":
+            raise
+        return numpy_trees(), "numpy"
+    return lgb.Booster(model_file=str(version_dir / MODEL_FILE)), "lightgbm"
+
+
+def load_artifact_dir(version_dir: Path) -> dict:
+    """Load a saved version into the artifact dict used by the forecasting service."""
+    with (version_dir / MANIFEST_FILE).open("r") as f:
+        manifest = json.load(f)
+    with (version_dir / ENCODERS_FILE).open("r") as f:
+        encoders = json.load(f)
+
+    artifact: Dict[str, Any] = {
+        "feature_cols": manifest["feature_cols"],
+        "sku_encoder": JsonLabelEncoder.from_json(encoders["sku_encoder"]),
+        "manifest": manifest,
+    }
+
+    from app.services.shared_artifact import (
+        attach_history_index,
+        publish_shared_artifact,
+        shared_artifact_enabled,
+    )
+
+    shared = shared_artifact_enabled()
+    if shared:
+        # Every worker maps the same snapshot; the first one to get here
+        # publishes it if training did not.
+        publish_shared_artifact(version_dir)
+        index = attach_history_index(version_dir)
+        artifact["history_index"] = index
+        artifact["history_df"] = index.frame()
+    else:
+        artifact["history_df"] = read_history(version_dir)
+
+    if manifest["model_format"] == "lightgbm":
+        artifact["model"], artifact["model_backend"] = _load_model(version_dir, manifest, shared)
+    else:
+        from app.services.fallback_model import SimpleModel
+
+        artifact["model"] = SimpleModel()
+        artifact["model_backend"] = "fallback"
+        artifact["_fallback"] = True
+    if "val_mae" in manifest:
+        artifact["val_mae"] = manifest["val_mae"]
+    return artifact
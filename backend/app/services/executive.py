@@ -1,7 +1,7 @@
 from typing import Dict, Any
 
-from .forecasting import load_artifact
-from .overview import compute_overview, compute_sku_health
+from .aggregates import get_recent_aggregates
+from .overview import compute_overview
 
 
 def compute_pulse(horizon: int = 14, low_threshold: float = 1.0) -> Dict[str, Any]:
@@ -12,19 +12,19 @@ def compute_pulse(horizon: int = 14, low_threshold: float = 1.0) -> Dict[str, An
     when inventory snapshots or price history are available they should
     be incorporated to improve the metrics.
     """
-    artifact = load_artifact()
     # Use compute_overview for aggregated numbers
     overview = compute_overview(horizon=horizon)
 
-    # Use SKU health to compute inventory health score (fraction sufficient)
-    sku_health = compute_sku_health(horizon=horizon, low_threshold=low_threshold)
-    skus = sku_health.get("skus", [])
-    total_skus = len(skus)
-    sufficient = sum(1 for s in skus if s.get("status") == "sufficient")
+    # Use the shared per-SKU averages to compute inventory health score
+    # (fraction sufficient), with the same status rule as compute_sku_health
+    sku_avgs = get_recent_aggregates().sku_stats["avg"].to_numpy(dtype=float)
+    total_skus = len(sku_avgs)
+    low = sku_avgs < low_threshold
+    sufficient = int(total_skus - low.sum())
     inventory_health_score = float((sufficient / total_skus) * 100.0) if total_skus > 0 else 100.0
 
     # Projected stockout: count of SKUs marked low (approximate) and estimate value
-    projected_stockout_count = int(sum(1 for s in skus if s.get("status") == "low"))
+    projected_stockout_count = int(low.sum())
 
     # Estimate projected_stockout_value using overview total_forecast_value distribution
     try:
@@ -7,7 +7,7 @@ class SimpleModel:
 
     This model is a placeholder; forecasting logic should prefer using the
     iterative recent-targets exponential smoothing implemented in
-    `forecasting._iterative_forecast_for_sku` when `_fallback` is True.
+    `forecasting._iterative_forecast_for_skus` when `_fallback` is True.
     """
 
     def predict(self, X: Iterable[Iterable[float]]) -> List[float]:
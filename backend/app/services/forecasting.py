@@ -1,39 +1,118 @@
 from __future__ import annotations
 
-from datetime import timedelta
+import threading
 from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Sequence, Tuple
 
-import joblib
 import numpy as np
 import pandas as pd
 
+from app.data_loader import load_config
+from app.features.lag_state import LagState
+from .artifact_store import latest_version_dir, load_artifact_dir
+from .cache import TTLCache
+from .history_index import CONTEXT_COLUMNS, HistoryIndex
+from .precomputed import lookup_precomputed, serving_precomputed
+from .predictor import make_predictor
+from .sku_registry import SkuRegistry
 
+# Legacy single-file artifact; the versioned directory in artifact_store wins
 MODEL_PATH = Path(__file__).resolve().parent.parent / "models" / "demand_model.joblib"
 
 
-@lru_cache(maxsize=1)
+def _build_forecast_cache() -> TTLCache:
+    try:
+        cache_cfg = load_config().get("forecast", {}).get("cache", {})
+    except Exception:
+        cache_cfg = {}
+    return TTLCache(
+        max_entries=cache_cfg.get("max_entries", 4096),
+        ttl=cache_cfg.get("ttl_seconds", 900),
+    )
+
+
+# Forecasts keyed by (artifact version, sku, horizon). Entries from an older
+# artifact are dropped as soon as a new model file is loaded.
+_forecast_cache = _build_forecast_cache()
+
+
+def _artifact_version() -> str:
+    """Identify the artifact on disk so a replaced one is picked up."""
+    version_dir = latest_version_dir()
+    if version_dir is not None:
+        return f"dir:{version_dir.name}"
+    try:
+        stat = MODEL_PATH.stat()
+    except OSError:
+        return "fallback"
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+# Serializes loads so concurrent first callers (warm-up, a lazy request)
+# wait for one read of the artifact instead of each doing their own
+_load_lock = threading.Lock()
+# Last artifact loaded, for status reporting without triggering a load
+_loaded_artifact: Optional[dict] = None
+
+
 def load_artifact() -> dict:
+    version = _artifact_version()
+    with _load_lock:
+        return _load_artifact_version(version)
+
+
+@lru_cache(maxsize=1)
+def _load_artifact_version(version: str) -> dict:
+    artifact = _read_artifact()
+    # Index the history once per load so per-request SKU lookups don't scan
+    # or copy the full frame. Versioned artifacts arrive with a shared,
+    # memory-mapped index already attached.
+    if "history_index" not in artifact:
+        artifact["history_index"] = HistoryIndex(artifact["history_df"])
+    artifact["sku_registry"] = SkuRegistry(artifact["history_index"].skus)
+    # Unwrap LightGBM models to their Booster once, not per prediction
+    artifact["predictor"] = make_predictor(artifact["model"])
+    artifact["version"] = version
+    _forecast_cache.discard_where(lambda key: key[0] != version)
+    global _loaded_artifact
+    _loaded_artifact = artifact
+    return artifact
+
+
+def forecast_cache_stats() -> dict:
+    return _forecast_cache.stats()
+
+
+def _read_artifact() -> dict:
     # Prefer the trained artifact if present, but be resilient: if the
     # artifact requires unavailable packages (e.g. scikit-learn) we build
     # a minimal runtime artifact so the API remains usable for demos.
+    version_dir = latest_version_dir()
+    if version_dir is not None:
+        try:
+            return load_artifact_dir(version_dir)
+        except ModuleNotFoundError:
+            pass
+
     if MODEL_PATH.exists():
         try:
+            import joblib
+
             return joblib.load(MODEL_PATH)
         except ModuleNotFoundError:
             # Fall through to create a lightweight artifact
             pass
 
     # Fallback: construct a simple artifact using historical data
-    # Prefer live BigQuery-backed data if available, otherwise fall back
-    # to the offline parquet features (if present).
+    # Prefer the local demand store (incrementally synced from BigQuery),
+    # otherwise fall back to the offline parquet features (if present).
     try:
-        from app.data.bigquery_client import fetch_demand_with_context
+        from app.data.demand_store import load_demand_history
 
-        history_df = fetch_demand_with_context()
+        history_df = load_demand_history()
         if history_df.empty:
-            raise RuntimeError("BigQuery returned no history")
+            raise RuntimeError("Demand store has no history")
     except Exception:
         from app.data_loader import load_history_df
 
@@ -78,36 +157,33 @@ def load_artifact() -> dict:
     return artifact
 
 
-def list_skus() -> List[str]:
-    artifact = load_artifact()
-    history_df: pd.DataFrame = artifact["history_df"]
-    skus = sorted(history_df["sku"].astype(str).unique())
-    return skus
+def model_status() -> Optional[dict]:
+    """Describe the model currently serving forecasts, or None if none has loaded.
 
+    Never loads the artifact itself, so a status probe cannot block on or
+    race the startup warm-up.
+    """
+    artifact = _loaded_artifact
+    if artifact is None:
+        return None
+    using_fallback = bool(artifact.get("_fallback", False))
+    return {
+        "using_fallback": using_fallback,
+        "backend": artifact.get("model_backend", "fallback" if using_fallback else "joblib"),
+        "version": artifact["version"],
+    }
 
-def _iterative_forecast_for_sku(sku: str, horizon: int) -> pd.DataFrame:
-    artifact = load_artifact()
-    model = artifact["model"]
-    feature_cols: List[str] = artifact["feature_cols"]
-    history_df: pd.DataFrame = artifact["history_df"].copy()
-    le = artifact["sku_encoder"]
 
-    history_df["date"] = pd.to_datetime(history_df["date"])
-    sku_history = history_df[history_df["sku"] == sku].sort_values("date")
-    if sku_history.empty:
-        raise ValueError(f"No history found for SKU '{sku}'.")
+def get_sku_registry() -> SkuRegistry:
+    return load_artifact()["sku_registry"]
 
-    encoded_sku = int(le.transform([sku])[0])
 
-    # Maintain recent target history for lag/rolling computation
-    recent_targets: List[float] = list(
-        sku_history["total_quantity"].astype(float).values
-    )
+def list_skus() -> List[str]:
+    return get_sku_registry().all()
 
-    last_date = sku_history["date"].max()
-    forecasts: List[dict] = []
 
-    # Derive which lags and rolling windows exist from feature_cols
+def _parse_feature_layout(feature_cols: List[str]) -> Tuple[List[int], List[int]]:
+    """Derive which lags and rolling windows exist from feature_cols."""
     lags: List[int] = []
     rolling_windows: List[int] = []
     for col in feature_cols:
@@ -115,80 +191,172 @@ def _iterative_forecast_for_sku(sku: str, horizon: int) -> pd.DataFrame:
             lags.append(int(col.split("_", 1)[1]))
         elif col.startswith("rolling_mean_"):
             rolling_windows.append(int(col.split("_", 2)[2]))
+    return lags, rolling_windows
 
-    max_lag = max(lags + rolling_windows) if (lags or rolling_windows) else 0
-    if max_lag > 0 and len(recent_targets) < max_lag:
-        # If history is very short, pad with the first observed value
-        first_val = recent_targets[0]
-        while len(recent_targets) < max_lag:
-            recent_targets.insert(0, first_val)
-
-    # Capture latest context features for this SKU/date to reuse in the future horizon
-    latest_row = sku_history.sort_values("date").iloc[-1]
-    context_defaults: dict = {}
-    for col in ["event_count", "active_users", "price", "product_category_encoded"]:
-        if col in sku_history.columns:
-            context_defaults[col] = float(latest_row[col])
-
-    for step in range(1, horizon + 1):
-        forecast_date = last_date + timedelta(days=step)
 
-        row: dict = {
-            "sku_encoded": encoded_sku,
-            "day_of_week": int(forecast_date.weekday()),
-            "month": int(forecast_date.month),
+def _empty_forecast_frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "date": pd.Series(dtype="datetime64[ns]"),
+            "sku": pd.Series(dtype=object),
+            "forecast": pd.Series(dtype=float),
         }
+    )
 
-        # Numeric context features: keep last observed value
-        for ctx_col, value in context_defaults.items():
-            row[ctx_col] = value
 
-        for lag in lags:
-            row[f"lag_{lag}"] = float(recent_targets[-lag])
+def _iterative_forecast_for_skus(
+    artifact: dict, skus: Sequence[str], horizon: int
+) -> pd.DataFrame:
+    """Advance all requested SKUs one horizon step at a time.
 
-        for window in rolling_windows:
-            window_vals = recent_targets[-window:]
-            row[f"rolling_mean_{window}"] = float(np.mean(window_vals))
+    Every step builds a single (n_skus x n_features) matrix and issues one
+    `predict_matrix` call for the whole batch, instead of one tiny call per
+    SKU per step.
+    """
+    predictor = artifact.get("predictor") or make_predictor(artifact["model"])
+    feature_cols: List[str] = artifact["feature_cols"]
+    index: HistoryIndex = artifact["history_index"]
+    le = artifact["sku_encoder"]
+
+    skus = [str(s) for s in skus]
+    if not skus:
+        return _empty_forecast_frame()
+
+    histories = []
+    for sku in skus:
+        sku_history = index.get(sku)
+        if sku_history is None:
+            raise ValueError(f"No history found for SKU '{sku}'.")
+        histories.append(sku_history)
 
-        # Build feature matrix defensively: if a feature is missing from the
-        # constructed `row` (e.g. encoded categorical features), fill with 0.0
-        # so the model / fallback logic can continue without raising KeyError.
-        X = np.array([[row.get(c, 0.0) for c in feature_cols]])
+    lags, rolling_windows = _parse_feature_layout(feature_cols)
+    max_lag = max(lags + rolling_windows) if (lags or rolling_windows) else 0
+    # The fallback smoother looks at up to the last 7 observations
+    width = max(max_lag, 7)
+
+    n = len(skus)
+    col_index = {c: i for i, c in enumerate(feature_cols)}
+    context_cols = [c for c in CONTEXT_COLUMNS if c in col_index]
+
+    # Recent targets for every SKU, right-aligned. If history is very short,
+    # pad with the first observed value.
+    recent_targets = np.empty((n, width), dtype=float)
+    context = np.zeros((n, len(context_cols)), dtype=float)
+    last_dates = np.empty(n, dtype="datetime64[ns]")
+    for i, sku_history in enumerate(histories):
+        values = sku_history.targets[-width:]
+        recent_targets[i, : width - len(values)] = values[0]
+        recent_targets[i, width - len(values) :] = values
+        last_dates[i] = sku_history.last_date
+        # Latest context features for this SKU are reused over the horizon
+        latest = sku_history.latest_context()
+        for j, col in enumerate(context_cols):
+            context[i, j] = latest.get(col, 0.0)
+
+    encoded_skus = np.asarray(le.transform(skus), dtype=float)
+    use_fallback = artifact.get("_fallback", False)
+
+    # Build feature matrix defensively: features missing from the layout
+    # (e.g. encoded categoricals) stay at 0.0 so prediction can continue.
+    # float32 is what the Booster consumes, so no per-step conversion.
+    X = np.zeros((n, len(feature_cols)), dtype=np.float32)
+    if "sku_encoded" in col_index:
+        X[:, col_index["sku_encoded"]] = encoded_skus
+    for j, col in enumerate(context_cols):
+        X[:, col_index[col]] = context[:, j]
+
+    state = LagState(recent_targets, lags, rolling_windows, capacity=width)
+    forecasts = np.empty((n, horizon), dtype=float)
+    forecast_dates = np.empty((n, horizon), dtype="datetime64[ns]")
+    for step in range(1, horizon + 1):
+        step_dates = pd.DatetimeIndex(last_dates + np.timedelta64(step, "D"))
+        forecast_dates[:, step - 1] = step_dates.to_numpy()
+
+        if "day_of_week" in col_index:
+            X[:, col_index["day_of_week"]] = step_dates.dayofweek
+        if "month" in col_index:
+            X[:, col_index["month"]] = step_dates.month
+        for lag in lags:
+            X[:, col_index[f"lag_{lag}"]] = state.lag(lag)
+        for window in rolling_windows:
+            X[:, col_index[f"rolling_mean_{window}"]] = state.rolling_mean(window)
 
         # If we are using the fallback artifact, produce forecasts using a
-        # simple exponential smoothing over recent_targets rather than
+        # simple exponential smoothing over recent targets rather than
         # calling a missing/full ML model. This avoids depending on
         # scikit-learn when it's not installed.
-        if artifact.get("_fallback", False):
-            # Simple exponential smoothing: alpha-weighted average with alpha=0.3
+        if use_fallback:
             alpha = 0.3
-            if len(recent_targets) == 0:
-                y_pred = 0.0
-            else:
-                s = recent_targets[-1]
-                # apply smoothing over the last up to 7 points
-                for val in recent_targets[-7:][::-1]:
-                    s = alpha * val + (1 - alpha) * s
-                y_pred = float(s)
+            s = state.lag(1)
+            for k in range(1, 8):
+                s = alpha * state.lag(k) + (1 - alpha) * s
+            y_pred = s
         else:
-            y_pred = float(model.predict(X)[0])
-        recent_targets.append(y_pred)
+            y_pred = predictor.predict_matrix(X)
 
-        forecasts.append(
-            {
-                "date": forecast_date,
-                "sku": sku,
-                "forecast": y_pred,
-            }
-        )
+        state.push(y_pred)
+        forecasts[:, step - 1] = y_pred
 
-    return pd.DataFrame(forecasts)
+    return pd.DataFrame(
+        {
+            "date": forecast_dates.ravel(),
+            "sku": np.repeat(np.asarray(skus, dtype=object), horizon),
+            "forecast": forecasts.ravel(),
+        }
+    )
 
 
-def forecast_sku(sku: str, horizon: int) -> pd.DataFrame:
+def forecast_skus(skus: Sequence[str], horizon: int) -> pd.DataFrame:
     """
-    Public entry point used by FastAPI layer.
+    Forecast many SKUs at once with one model call per horizon step.
+
+    Returns a long frame with columns `date`, `sku` and `forecast`, ordered
+    by SKU (in request order) and then by date. In "serve precomputed"
+    mode SKUs present in a nightly batch table built by the serving model
+    from the current history are answered from it; the rest come from the
+    forecast cache, and only cache misses hit the model.
     """
-    return _iterative_forecast_for_sku(sku, horizon=horizon)
+    skus = [str(s) for s in skus]
+    frames: dict = {}
+    pending = list(dict.fromkeys(skus))
+
+    if serving_precomputed():
+        artifact = load_artifact()
+        as_of = artifact["history_index"].end_date
+        live: List[str] = []
+        for sku in pending:
+            precomputed = lookup_precomputed(sku, horizon, artifact["version"], as_of)
+            if precomputed is None:
+                live.append(sku)
+            else:
+                frames[sku] = precomputed
+        pending = live
+
+    misses: List[str] = []
+    if pending:
+        artifact = load_artifact()
+        version = artifact["version"]
+        for sku in pending:
+            cached = _forecast_cache.get((version, sku, horizon))
+            if cached is None:
+                misses.append(sku)
+            else:
+                frames[sku] = cached
+
+    if misses:
+        computed = _iterative_forecast_for_skus(artifact, misses, horizon=horizon)
+        for i, sku in enumerate(misses):
+            frame = computed.iloc[i * horizon : (i + 1) * horizon].reset_index(drop=True)
+            _forecast_cache.put((version, sku, horizon), frame)
+            frames[sku] = frame
 
+    if not skus:
+        return _empty_forecast_frame()
+    return pd.concat([frames[sku] for sku in skus], ignore_index=True)
 
+
+def forecast_sku(sku: str, horizon: int) -> pd.DataFrame:
+    """
+    Public entry point used by FastAPI layer.
+    """
+    return forecast_skus([sku], horizon=horizon)
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+CONTEXT_COLUMNS = ["event_count", "active_users", "price", "product_category_encoded"]
+
+
+@dataclass(frozen=True)
+class SkuHistory:
+    """Date-sorted history of a single SKU as read-only numpy views."""
+
+    dates: np.ndarray
+    targets: np.ndarray
+    context: Dict[str, np.ndarray]
+
+    @property
+    def last_date(self) -> np.datetime64:
+        return self.dates[-1]
+
+    def latest_context(self) -> Dict[str, float]:
+        return {col: float(values[-1]) for col, values in self.context.items()}
+
+
+class HistoryIndex:
+    """Immutable per-SKU index over the artifact history frame.
+
+    The frame is parsed and sorted once; each SKU maps to a contiguous slice
+    of the sorted column arrays, so a lookup costs O(1) regardless of how
+    many SKUs or rows the history holds.
+    """
+
+    def __init__(
+        self,
+        history_df: pd.DataFrame,
+        target_col: str = "total_quantity",
+        context_cols: Iterable[str] = CONTEXT_COLUMNS,
+    ):
+        df = history_df[
+            ["date", "sku", target_col]
+            + [c for c in context_cols if c in history_df.columns]
+        ]
+        skus = df["sku"].astype(str).to_numpy(dtype=str)
+        dates = pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[ns]")
+        order = np.lexsort((dates, skus))
+
+        skus = skus[order]
+        if len(skus):
+            starts = np.flatnonzero(np.r_[True, skus[1:] != skus[:-1]])
+        else:
+            starts = np.array([], dtype=int)
+        self._set_arrays(
+            [str(s) for s in skus[starts]],
+            np.r_[starts, len(skus)].astype(np.int64),
+            dates[order],
+            df[target_col].to_numpy(dtype=float)[order],
+            {col: df[col].to_numpy(dtype=float)[order] for col in df.columns[3:]},
+        )
+
+    def _set_arrays(
+        self,
+        skus: List[str],
+        offsets: np.ndarray,
+        dates: np.ndarray,
+        targets: np.ndarray,
+        context: Dict[str, np.ndarray],
+    ) -> None:
+        self._sku_names = list(skus)
+        self._offsets = _readonly(offsets)
+        self._dates = _readonly(dates)
+        self._targets = _readonly(targets)
+        self._context = {col: _readonly(values) for col, values in context.items()}
+        self._slices: Dict[str, slice] = {
+            sku: slice(int(start), int(stop))
+            for sku, start, stop in zip(self._sku_names, offsets[:-1], offsets[1:])
+        }
+
+    @classmethod
+    def from_arrays(
+        cls,
+        skus: List[str],
+        offsets: np.ndarray,
+        dates: np.ndarray,
+        targets: np.ndarray,
+        context: Dict[str, np.ndarray],
+    ) -> "HistoryIndex":
+        """Rebuild an index from `to_arrays()` output without re-sorting.
+
+        The arrays are used as-is, so memory-mapped inputs stay shared.
+        """
+        index = cls.__new__(cls)
+        index._set_arrays(skus, offsets, dates, targets, context)
+        return index
+
+    def to_arrays(self) -> Dict[str, object]:
+        """Return the sorted columns plus SKU names and row offsets (len(skus) + 1)."""
+        return {
+            "skus": list(self._sku_names),
+            "offsets": self._offsets,
+            "dates": self._dates,
+            "targets": self._targets,
+            "context": dict(self._context),
+        }
+
+    def frame(self, target_col: str = "total_quantity") -> pd.DataFrame:
+        """View the index as a (date, sku, target, context...) frame, sorted by SKU.
+
+        Numeric columns wrap the index arrays without copying and `sku` is
+        categorical, so no per-row strings are created.
+        """
+        codes = np.repeat(
+            np.arange(len(self._sku_names), dtype=np.int32), np.diff(self._offsets)
+        )
+        columns = {
+            "date": self._dates,
+            "sku": pd.Categorical.from_codes(codes, categories=self._sku_names),
+            target_col: self._targets,
+            **self._context,
+        }
+        return pd.DataFrame(columns, copy=False)
+
+    def __contains__(self, sku: object) -> bool:
+        return sku in self._slices
+
+    def __len__(self) -> int:
+        return len(self._slices)
+
+    @property
+    def skus(self) -> List[str]:
+        return list(self._slices)
+
+    @property
+    def end_date(self) -> Optional[np.datetime64]:
+        """Latest date across all SKUs, or None for an empty index."""
+        if not len(self._dates):
+            return None
+        # Each SKU's slice is date-sorted, so its last row is its latest date
+        return self._dates[self._offsets[1:] - 1].max()
+
+    def get(self, sku: str) -> Optional[SkuHistory]:
+        rows = self._slices.get(sku)
+        if rows is None:
+            return None
+        return SkuHistory(
+            dates=self._dates[rows],
+            targets=self._targets[rows],
+            context={col: values[rows] for col, values in self._context.items()},
+        )
+
+
+def _readonly(values: np.ndarray) -> np.ndarray:
+    values = np.ascontiguousarray(values)
+    if values.flags.writeable:
+        values.flags.writeable = False
+    return values
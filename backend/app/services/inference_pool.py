@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict
+
+from app.data_loader import load_config
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when the inference pool already holds `max_pending` jobs."""
+
+
+class InferencePool:
+    """Dedicated worker pool for CPU-bound forecasting work.
+
+    Keeps pandas/LightGBM jobs off the event loop and out of the shared
+    request threadpool, and refuses new work once `max_pending` jobs are
+    running or queued so callers can shed load instead of piling up.
+    Threads are used rather than processes because numpy and LightGBM
+    release the GIL and the loaded artifact is shared in-process.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(self.max_workers, int(max_pending))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="inference"
+        )
+        # Released by the job's done callback on a worker thread, so a
+        # request that stops waiting (client gone, timeout) keeps counting
+        # until its job has actually finished
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PoolSaturatedError(
+                    f"Inference queue is full ({self._pending} pending); retry shortly."
+                )
+            self._pending += 1
+        try:
+            future = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future: Any = None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def get_inference_pool() -> InferencePool:
+    try:
+        serving_cfg = load_config().get("serving", {})
+    except Exception:
+        serving_cfg = {}
+    return InferencePool(
+        max_workers=serving_cfg.get("inference_workers") or os.cpu_count() or 4,
+        max_pending=serving_cfg.get("max_pending_inference", 64),
+    )
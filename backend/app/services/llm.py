@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import os
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 import requests
 import logging
@@ -11,10 +11,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-def _call_openai(prompt: str, max_tokens: int = 256) -> str:
-    """Call OpenAI Chat Completions API with a single user message and
-    return the assistant text. Reads `OPENAI_API_KEY` and optional
-    `OPENAI_MODEL` from env. Defaults to `gpt-3.5-turbo`.
+def _openai_request(prompt: str, max_tokens: int) -> Tuple[str, Dict[str, str], Dict[str, object]]:
+    """Build the (url, headers, body) for a single-message Chat Completions call.
+    Reads `OPENAI_API_KEY` and optional `OPENAI_MODEL` from env. Defaults to
+    `gpt-3.5-turbo`.
     """
     load_dotenv()
 
@@ -31,7 +31,22 @@ def _call_openai(prompt: str, max_tokens: int = 256) -> str:
         "max_tokens": max_tokens,
         "temperature": 0.2,
     }
+    return url, headers, body
 
+
+def _chat_content(data: Dict[str, object]) -> str:
+    # Chat response in choices[0].message.content
+    try:
+        return data.get("choices", [])[0].get("message", {}).get("content", "")
+    except Exception:
+        return ""
+
+
+def _call_openai(prompt: str, max_tokens: int = 256) -> str:
+    """Call OpenAI Chat Completions API with a single user message and
+    return the assistant text.
+    """
+    url, headers, body = _openai_request(prompt, max_tokens)
     try:
         resp = requests.post(url, headers=headers, json=body, timeout=20)
         resp.raise_for_status()
@@ -40,34 +55,51 @@ def _call_openai(prompt: str, max_tokens: int = 256) -> str:
         logging.exception("OpenAI API request failed")
         raise
 
-    # Chat response in choices[0].message.content
-    try:
-        return data.get("choices", [])[0].get("message", {}).get("content", "")
-    except Exception:
-        return ""
+    return _chat_content(data)
 
 
-def summarize_forecast(sku: str, points: List[Dict[str, object]]) -> str:
+async def _call_openai_async(prompt: str, max_tokens: int = 256) -> str:
+    """Non-blocking variant of `_call_openai` for use from async endpoints,
+    so a slow provider never ties up a worker thread.
     """
-    Produce a human-readable summary for a SKU forecast using OpenAI.
+    import httpx
 
-    `points` is a list of dicts with keys: `date` (ISO str) and `forecast` (float).
-    """
-    if not points:
-        return "No forecast data available to summarize."
+    url, headers, body = _openai_request(prompt, max_tokens)
+    try:
+        async with httpx.AsyncClient(timeout=20) as client:
+            resp = await client.post(url, headers=headers, json=body)
+            resp.raise_for_status()
+            data = resp.json()
+    except Exception:
+        logging.exception("OpenAI API request failed")
+        raise
 
+    return _chat_content(data)
+
+
+def _summary_prompt(sku: str, points: List[Dict[str, object]]) -> str:
     # Build a concise prompt with the forecast table and instructions
     lines = [f"SKU: {sku}", "Forecast (date -> value):"]
     for p in points:
         lines.append(f"- {p.get('date')}: {p.get('forecast')}")
 
-    prompt = (
+    return (
         "\n".join(lines)
         + "\n\nPlease provide a short summary (3-5 sentences) describing the trend, any notable peaks or drops, the average forecast, and one practical recommendation for demand planning."
     )
 
+
+def summarize_forecast(sku: str, points: List[Dict[str, object]]) -> str:
+    """
+    Produce a human-readable summary for a SKU forecast using OpenAI.
+
+    `points` is a list of dicts with keys: `date` (ISO str) and `forecast` (float).
+    """
+    if not points:
+        return "No forecast data available to summarize."
+
     try:
-        return _call_openai(prompt)
+        return _call_openai(_summary_prompt(sku, points))
     except Exception:
         logging.exception("summarize_forecast: LLM call failed for SKU %s, using local fallback", sku)
         # Fall back to a deterministic local summarizer so the dashboard
@@ -75,6 +107,18 @@ def summarize_forecast(sku: str, points: List[Dict[str, object]]) -> str:
         return _local_summarize(sku, points)
 
 
+async def summarize_forecast_async(sku: str, points: List[Dict[str, object]]) -> str:
+    """Async counterpart of `summarize_forecast` with the same local fallback."""
+    if not points:
+        return "No forecast data available to summarize."
+
+    try:
+        return await _call_openai_async(_summary_prompt(sku, points))
+    except Exception:
+        logging.exception("summarize_forecast: LLM call failed for SKU %s, using local fallback", sku)
+        return _local_summarize(sku, points)
+
+
 def _local_summarize(sku: str, points: List[Dict[str, object]]) -> str:
     """Produce a concise, human-readable summary from numeric forecast points.
 
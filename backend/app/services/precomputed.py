@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.data_loader import load_config
+
+
+# Schema metadata src/predict.py stamps on every batch table
+MODEL_VERSION_KEY = b"forecast.model_version"
+AS_OF_KEY = b"forecast.as_of"
+
+
+class PrecomputedForecastTable:
+    """Batch forecasts for one horizon, read once from the nightly parquet.
+
+    Rows are grouped by SKU once at load time so each lookup is a dict hit
+    plus two array slices. `model_version` and `as_of` (the last history
+    date the forecasts continue from) come from the file's metadata and
+    are None for tables written without them.
+    """
+
+    def __init__(self, path: Path, date_col: str = "date", sku_col: str = "sku"):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path, columns=[date_col, sku_col, "forecast"])
+        metadata = table.schema.metadata or {}
+        model_version = metadata.get(MODEL_VERSION_KEY)
+        as_of = metadata.get(AS_OF_KEY)
+        self.model_version = model_version.decode() if model_version else None
+        self.as_of = np.datetime64(as_of.decode(), "ns") if as_of else None
+
+        skus = table.column(sku_col).to_numpy(zero_copy_only=False).astype(str)
+        dates = table.column(date_col).to_numpy(zero_copy_only=False)
+        forecasts = table.column("forecast").to_numpy(zero_copy_only=False)
+
+        # src/predict.py writes rows grouped by SKU; only reorder if needed
+        if len(skus) and np.any(skus[1:] < skus[:-1]):
+            order = np.argsort(skus, kind="stable")
+            skus, dates, forecasts = skus[order], dates[order], forecasts[order]
+
+        self.path = path
+        self._dates = dates.astype("datetime64[ns]")
+        self._forecasts = forecasts.astype(float, copy=False)
+        if len(skus):
+            starts = np.flatnonzero(np.r_[True, skus[1:] != skus[:-1]])
+        else:
+            starts = np.array([], dtype=int)
+        stops = np.r_[starts[1:], len(skus)].astype(int)
+        self._slices: Dict[str, slice] = {
+            str(skus[start]): slice(int(start), int(stop))
+            for start, stop in zip(starts, stops)
+        }
+
+    def __contains__(self, sku: object) -> bool:
+        return sku in self._slices
+
+    def __len__(self) -> int:
+        return len(self._slices)
+
+    def lookup(self, sku: str) -> Optional[pd.DataFrame]:
+        rows = self._slices.get(sku)
+        if rows is None:
+            return None
+        return pd.DataFrame(
+            {
+                "date": self._dates[rows],
+                "sku": sku,
+                "forecast": self._forecasts[rows],
+            }
+        )
+
+
+_tables: Dict[int, tuple] = {}
+_lock = threading.Lock()
+
+
+def serving_precomputed() -> bool:
+    try:
+        return bool(load_config().get("forecast", {}).get("serve_precomputed", False))
+    except Exception:
+        return False
+
+
+def precomputed_horizons() -> List[int]:
+    cfg = load_config()
+    return list(cfg.get("forecast", {}).get("default_horizons", []))
+
+
+def precomputed_path(horizon: int) -> Path:
+    cfg = load_config()
+    forecast_dir = Path(cfg["paths"]["forecast_output_dir"])
+    return forecast_dir / f"forecasts_h{horizon}.parquet"
+
+
+def get_precomputed_table(horizon: int) -> Optional[PrecomputedForecastTable]:
+    """Return the table for `horizon`, reloading it when predict.py rewrites the file."""
+    if horizon not in precomputed_horizons():
+        return None
+    path = precomputed_path(horizon)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        cached = _tables.get(horizon)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        cfg = load_config()
+        table = PrecomputedForecastTable(
+            path,
+            date_col=cfg["data"]["date_column"],
+            sku_col=cfg["data"]["sku_column"],
+        )
+        _tables[horizon] = (version, table)
+        return table
+
+
+def lookup_precomputed(
+    sku: str, horizon: int, model_version: str, as_of: np.datetime64
+) -> Optional[pd.DataFrame]:
+    """Return the precomputed forecast for a SKU, or None if it must be computed live.
+
+    The table is only used when it was produced by the serving model
+    (`model_version`) from history ending on `as_of`; a stale or foreign
+    batch falls back to live inference.
+    """
+    try:
+        table = get_precomputed_table(horizon)
+    except Exception:
+        return None
+    if table is None:
+        return None
+    if table.model_version != model_version or table.as_of != as_of:
+        return None
+    return table.lookup(sku)
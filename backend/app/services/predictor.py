@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import numpy as np
+
+from app.data_loader import load_config
+
+
+def _default_num_threads() -> Optional[int]:
+    try:
+        value = load_config().get("serving", {}).get("predict_num_threads")
+    except Exception:
+        value = None
+    return int(value) if value else None
+
+
+class ModelPredictor:
+    """Uniform `predict_matrix` over whatever model the artifact holds.
+
+    This generic version just forwards to `model.predict`; it serves the
+    fallback model and any non-LightGBM estimator.
+    """
+
+    def __init__(self, model: Any):
+        self.model = model
+
+    def predict_matrix(self, X: np.ndarray, num_threads: Optional[int] = None) -> np.ndarray:
+        return np.asarray(self.model.predict(X), dtype=float)
+
+
+class BoosterPredictor(ModelPredictor):
+    """Predict straight from a LightGBM Booster.
+
+    Skips the sklearn wrapper (input validation, feature-name checks and
+    pandas conversion): callers pass a C-contiguous float32 matrix whose
+    columns are already in the model's feature order, and it goes to
+    LightGBM's C API as-is.
+    """
+
+    def __init__(self, booster: Any, num_threads: Optional[int] = None):
+        super().__init__(booster)
+        self.booster = booster
+        self.num_threads = num_threads
+
+    def predict_matrix(self, X: np.ndarray, num_threads: Optional[int] = None) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        params = {}
+        threads = num_threads or self.num_threads
+        if threads:
+            params["num_threads"] = threads
+        return self.booster.predict(X, validate_features=False, **params)
+
+
+def make_predictor(model: Any, num_threads: Optional[int] = None) -> ModelPredictor:
+    """Wrap `model`, unwrapping LGBMRegressor to its Booster when possible.
+
+    Models that already implement `predict_matrix` (the NumPy tree
+    ensemble) are returned as-is. `num_threads` defaults to
+    `serving.predict_num_threads` (null lets LightGBM use its own default).
+    """
+    if hasattr(model, "predict_matrix"):
+        return model
+    booster = getattr(model, "booster_", None)
+    if booster is None and type(model).__name__ == "Booster":
+        booster = model
+    if booster is None:
+        return ModelPredictor(model)
+    if num_threads is None:
+        num_threads = _default_num_threads()
+    return BoosterPredictor(booster, num_threads=num_threads)
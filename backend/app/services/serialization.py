@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+from fastapi.responses import Response
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def dumps(payload: Any) -> bytes:
+    """Encode `payload` as JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response that skips pydantic re-validation and encodes with `dumps`."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def iso_dates(values: Iterable) -> List[str]:
+    """Format a date column as YYYY-MM-DD strings in one vectorized pass."""
+    import numpy as np
+    import pandas as pd
+
+    days = np.asarray(pd.to_datetime(pd.Series(values)).to_numpy(), dtype="datetime64[D]")
+    return np.datetime_as_string(days).tolist()
+
+
+def series_records(dates: Iterable, values: Iterable, key: str) -> List[Dict[str, Any]]:
+    """Zip a date column and a value column into [{"date": ..., key: ...}] records."""
+    import numpy as np
+
+    floats = np.asarray(values, dtype=float).tolist()
+    return [{"date": d, key: v} for d, v in zip(iso_dates(dates), floats)]
+
+
+def forecast_points(forecast_df: pd.DataFrame, include_actual: bool = True) -> List[Dict[str, Any]]:
+    """Convert a (date, forecast) frame to the dashboard's point dicts."""
+    points = series_records(forecast_df["date"], forecast_df["forecast"], "forecast")
+    if include_actual:
+        return [{"date": p["date"], "actual": None, "forecast": p["forecast"]} for p in points]
+    return points
+
+
+def forecast_payload(sku: str, horizon: int, forecast_df: pd.DataFrame) -> Dict[str, Any]:
+    """Build the ForecastResponse-shaped dict without per-point pydantic models."""
+    return {"sku": sku, "horizon": horizon, "data": forecast_points(forecast_df)}
+
+
+def arrow_forecast_stream(
+    forecast_df: pd.DataFrame, metadata: Optional[Dict[str, str]] = None
+) -> bytes:
+    """Serialize a long (sku, date, forecast) frame as an Arrow IPC stream."""
+    import numpy as np
+    import pyarrow as pa
+
+    table = pa.table(
+        {
+            "sku": pa.array(forecast_df["sku"].astype(str).tolist(), type=pa.string()),
+            "date": pa.array(
+                np.asarray(forecast_df["date"].to_numpy(), dtype="datetime64[D]"),
+                type=pa.date32(),
+            ),
+            "forecast": pa.array(forecast_df["forecast"].to_numpy(dtype=float), type=pa.float64()),
+        }
+    )
+    if metadata:
+        table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,175 @@
+"""
+Memory-mapped serving snapshot shared by every API worker on a host.
+
+For each artifact version, one process writes the sorted history index
+(and the NumPy tree arrays, if exported) to `<version>/shared/` as plain
+`.npy` files. Workers then open them with `mmap_mode="r"`: the arrays are
+read-only views of the page cache, so N uvicorn workers hold one copy of
+the history instead of N.
+
+Publishing happens on first load (guarded by a lock file) or explicitly
+before starting the workers:
+
+    python -m app.services.shared_artifact
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from app.data_loader import load_config
+from .history_index import HistoryIndex
+
+SHARED_DIR = "shared"
+META_FILE = "meta.json"
+LOCK_FILE = ".shared.lock"
+
+
+def shared_artifact_enabled() -> bool:
+    try:
+        return bool(load_config().get("serving", {}).get("shared_artifact", True))
+    except Exception:
+        return True
+
+
+@contextmanager
+def _publish_lock(version_dir: Path) -> Iterator[None]:
+    """Serialize publishers on POSIX; elsewhere racing writers are resolved by rename."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with (version_dir / LOCK_FILE).open("w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def is_published(version_dir: Path) -> bool:
+    return (version_dir / SHARED_DIR / META_FILE).exists()
+
+
+def publish_shared_artifact(version_dir: Path, index: Optional[HistoryIndex] = None) -> Path:
+    """Write the serving snapshot for `version_dir` unless it already exists."""
+    shared_dir = version_dir / SHARED_DIR
+    if is_published(version_dir):
+        return shared_dir
+
+    with _publish_lock(version_dir):
+        if is_published(version_dir):
+            return shared_dir
+        if index is None:
+            from .artifact_store import read_history
+
+            index = HistoryIndex(read_history(version_dir))
+
+        tmp_dir = version_dir / f".{SHARED_DIR}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir()
+        arrays = index.to_arrays()
+        np.save(tmp_dir / "offsets.npy", np.asarray(arrays["offsets"], dtype=np.int64))
+        np.save(tmp_dir / "dates.npy", np.asarray(arrays["dates"], dtype="datetime64[ns]"))
+        np.save(tmp_dir / "targets.npy", np.asarray(arrays["targets"], dtype=float))
+        context_cols = list(arrays["context"])
+        for i, col in enumerate(context_cols):
+            np.save(tmp_dir / f"context_{i}.npy", np.asarray(arrays["context"][col], dtype=float))
+
+        tree_keys = []
+        trees_file = version_dir / "trees.npz"
+        if trees_file.exists():
+            (tmp_dir / "trees").mkdir()
+            with np.load(trees_file) as trees:
+                for key in trees.files:
+                    np.save(tmp_dir / "trees" / f"{key}.npy", trees[key])
+                    tree_keys.append(key)
+
+        # meta.json is written last: its presence marks a complete snapshot
+        with (tmp_dir / META_FILE).open("w") as f:
+            json.dump(
+                {"skus": arrays["skus"], "context_cols": context_cols, "tree_keys": tree_keys}, f
+            )
+        try:
+            tmp_dir.replace(shared_dir)
+        except OSError:
+            # Another process published first (no flock on this platform)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return shared_dir
+
+
+def unpublish_shared_artifact(version_dir: Path) -> None:
+    """Remove the snapshot so the next publish rebuilds it.
+
+    The directory is renamed away before deletion, so a worker never sees
+    a half-removed snapshot; workers that already mapped its files keep
+    their (unlinked) pages until they reload.
+    """
+    shared_dir = version_dir / SHARED_DIR
+    with _publish_lock(version_dir):
+        if not shared_dir.exists():
+            return
+        stale = version_dir / f".{SHARED_DIR}.{os.getpid()}.stale"
+        shutil.rmtree(stale, ignore_errors=True)
+        shared_dir.replace(stale)
+    shutil.rmtree(stale, ignore_errors=True)
+
+
+def _load(path: Path) -> np.ndarray:
+    return np.load(path, mmap_mode="r")
+
+
+def attach_history_index(version_dir: Path) -> HistoryIndex:
+    """Open the published history index as read-only memory-mapped arrays."""
+    shared_dir = version_dir / SHARED_DIR
+    with (shared_dir / META_FILE).open("r") as f:
+        meta = json.load(f)
+    context = {
+        col: _load(shared_dir / f"context_{i}.npy") for i, col in enumerate(meta["context_cols"])
+    }
+    return HistoryIndex.from_arrays(
+        skus=meta["skus"],
+        offsets=_load(shared_dir / "offsets.npy"),
+        dates=_load(shared_dir / "dates.npy"),
+        targets=_load(shared_dir / "targets.npy"),
+        context=context,
+    )
+
+
+def attach_tree_arrays(version_dir: Path) -> Optional[Dict[str, np.ndarray]]:
+    """Open the published NumPy tree arrays, or None if none were exported."""
+    shared_dir = version_dir / SHARED_DIR
+    with (shared_dir / META_FILE).open("r") as f:
+        keys = json.load(f).get("tree_keys", [])
+    if not keys:
+        return None
+    return {key: _load(shared_dir / "trees" / f"{key}.npy") for key in keys}
+
+
+def main() -> None:
+    import argparse
+
+    from .artifact_store import latest_version_dir
+
+    parser = argparse.ArgumentParser(description="Publish the shared serving snapshot for an artifact.")
+    parser.add_argument("version_dir", nargs="?", help="Artifact version directory (default: LATEST).")
+    args = parser.parse_args()
+
+    version_dir = Path(args.version_dir) if args.version_dir else latest_version_dir()
+    if version_dir is None:
+        raise SystemExit("No artifact version found.")
+    logging.basicConfig(level=logging.INFO)
+    print(f"Published shared artifact at: {publish_shared_artifact(version_dir)}")
+
+
+if __name__ == "__main__":
+    main()
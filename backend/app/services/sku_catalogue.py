@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+
+from app.data_loader import load_config
+from .sku_registry import SkuRegistry
+
+
+class SkuCatalogue:
+    """In-memory SKU catalogue refreshed in the background.
+
+    The first call loads synchronously, and concurrent first callers wait
+    for that one load rather than each starting their own; afterwards
+    callers always get the current registry immediately, and once it is
+    older than `refresh_interval` seconds a single background thread
+    reloads it (stale-while-revalidate). A failed refresh keeps serving the
+    old catalogue and is retried after another interval, so the loader runs
+    at most once per interval however much traffic the endpoint gets.
+
+    If the very first load fails, `fallback` (when given) supplies a
+    stand-in catalogue that is only kept for `retry_interval` seconds, so
+    the real source is retried soon instead of a full interval later.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], SkuRegistry],
+        refresh_interval: float = 900.0,
+        clock: Callable[[], float] = time.monotonic,
+        fallback: Optional[Callable[[], SkuRegistry]] = None,
+        retry_interval: float = 30.0,
+    ):
+        self._loader = loader
+        self._fallback = fallback
+        self.refresh_interval = float(refresh_interval)
+        self.retry_interval = float(retry_interval)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._registry: Optional[SkuRegistry] = None
+        self._etag = ""
+        # Clock time after which the current registry is refreshed
+        self._refresh_at = 0.0
+        # True while serving the fallback instead of a real load
+        self._degraded = False
+        self._refreshing = False
+        # Held for the initial synchronous load only
+        self._initial_load_lock = threading.Lock()
+
+    def get(self) -> Tuple[SkuRegistry, str]:
+        """Return the current (registry, etag), scheduling a refresh if stale."""
+        with self._lock:
+            registry, etag = self._registry, self._etag
+            stale = self._clock() >= self._refresh_at
+            start_refresh = registry is not None and stale and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+
+        if registry is None:
+            return self._initial_load()
+        if start_refresh:
+            threading.Thread(
+                target=self._refresh_in_background, name="sku-catalogue-refresh", daemon=True
+            ).start()
+        return registry, etag
+
+    def _initial_load(self) -> Tuple[SkuRegistry, str]:
+        with self._initial_load_lock:
+            with self._lock:
+                if self._registry is not None:
+                    return self._registry, self._etag
+            try:
+                return self.refresh()
+            except Exception:
+                if self._fallback is None:
+                    raise
+                logging.exception("SKU catalogue load failed; serving fallback catalogue")
+                return self._store(self._fallback(), degraded=True)
+
+    def refresh(self) -> Tuple[SkuRegistry, str]:
+        """Load the catalogue from `loader`; exceptions propagate unchanged."""
+        return self._store(self._loader(), degraded=False)
+
+    def _store(self, registry: SkuRegistry, degraded: bool) -> Tuple[SkuRegistry, str]:
+        digest = hashlib.sha1("\n".join(registry.all()).encode("utf-8")).hexdigest()
+        etag = f'"{digest[:32]}"'
+        interval = self.retry_interval if degraded else self.refresh_interval
+        with self._lock:
+            self._registry, self._etag = registry, etag
+            self._refresh_at = self._clock() + interval
+            self._degraded = degraded
+            self._refreshing = False
+        return registry, etag
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logging.exception("SKU catalogue refresh failed; serving previous catalogue")
+            with self._lock:
+                interval = self.retry_interval if self._degraded else self.refresh_interval
+                self._refresh_at = self._clock() + interval
+                self._refreshing = False
+
+
+def _load_catalogue() -> SkuRegistry:
+    """Load the live SKU list from BigQuery; errors propagate to the catalogue."""
+    from app.data.bigquery_client import list_skus as bq_list_skus
+
+    # Always ask BigQuery; the local query cache only answers when it is down
+    return SkuRegistry(bq_list_skus(max_cache_age=0))
+
+
+def _fallback_catalogue() -> SkuRegistry:
+    """Stand-in for a failed first load: the artifact's SKUs, else none."""
+    try:
+        from .forecasting import get_sku_registry
+
+        return get_sku_registry()
+    except Exception:
+        return SkuRegistry([])
+
+
+@lru_cache(maxsize=1)
+def get_sku_catalogue() -> SkuCatalogue:
+    try:
+        serving_cfg = load_config().get("serving", {})
+    except Exception:
+        serving_cfg = {}
+    return SkuCatalogue(
+        _load_catalogue,
+        refresh_interval=serving_cfg.get("sku_refresh_seconds", 900),
+        fallback=_fallback_catalogue,
+        retry_interval=serving_cfg.get("sku_retry_seconds", 30),
+    )
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Iterable, List, Optional
+
+
+class SkuRegistry:
+    """Immutable set of known SKUs, built once per artifact load.
+
+    Membership checks hit a frozenset; listing and prefix search use a
+    pre-sorted tuple so neither re-sorts the catalogue per request.
+    """
+
+    def __init__(self, skus: Iterable[object]):
+        members = frozenset(str(s) for s in skus)
+        self._members = members
+        self._sorted = tuple(sorted(members))
+
+    def __contains__(self, sku: object) -> bool:
+        return sku in self._members
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def all(self) -> List[str]:
+        return list(self._sorted)
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        end = None if limit is None else offset + limit
+        return list(self._sorted[offset:end])
+
+    def search(
+        self,
+        query: str,
+        match: str = "prefix",
+        limit: Optional[int] = None,
+    ) -> List[str]:
+        """Return SKUs in sorted order that start with (or contain) `query`.
+
+        Prefix matches are located by binary search; substring matches scan
+        the sorted catalogue.
+        """
+        if match == "prefix":
+            start = bisect_left(self._sorted, query)
+            results: List[str] = []
+            # Index from `start` rather than slicing, which would copy the tail
+            for i in range(start, len(self._sorted)):
+                sku = self._sorted[i]
+                if not sku.startswith(query) or (limit is not None and len(results) >= limit):
+                    break
+                results.append(sku)
+            return results
+        if match == "substring":
+            results = [sku for sku in self._sorted if query in sku]
+            return results if limit is None else results[:limit]
+        raise ValueError(f"Unknown match mode '{match}'. Use 'prefix' or 'substring'.")
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from app.data_loader import load_config
+
+
+STARTUP_MODES = ("background", "eager", "lazy")
+
+
+class StartupState:
+    """Readiness flag plus named timings recorded while the API starts.
+
+    `/health` only says the process is up; readiness flips once warm-up
+    (importing the forecasting stack and loading the artifact) has
+    finished, so an orchestrator can hold traffic until then.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings: Dict[str, float] = {}
+        self._ready = threading.Event()
+        self.mode = "background"
+        self.error: Optional[str] = None
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._timings[name] = round(seconds, 4)
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def mark_ready(self) -> None:
+        self.error = None
+        self._ready.set()
+
+    def mark_failed(self, error: str) -> None:
+        self.error = error
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            timings = dict(self._timings)
+        if self.ready:
+            status = "ready"
+        elif self.error:
+            status = "failed"
+        else:
+            status = "warming"
+        return {"status": status, "mode": self.mode, "error": self.error, "timings": timings}
+
+
+startup_state = StartupState()
+
+
+def startup_mode() -> str:
+    try:
+        mode = load_config().get("serving", {}).get("startup_mode", "background")
+    except Exception:
+        mode = "background"
+    return mode if mode in STARTUP_MODES else "background"
+
+
+def warm_up(state: StartupState = startup_state) -> None:
+    """Import the forecasting stack and load the artifact, timing each step."""
+    try:
+        with state.timed("import_forecasting"):
+            from app.services import forecasting
+        with state.timed("load_artifact"):
+            forecasting.load_artifact()
+        with state.timed("sku_registry"):
+            forecasting.get_sku_registry()
+        with state.timed("inference_pool"):
+            from app.services.inference_pool import get_inference_pool
+
+            get_inference_pool()
+    except Exception as e:
+        logging.exception("Startup warm-up failed")
+        state.mark_failed(f"{type(e).__name__}: {e}")
+        return
+    state.mark_ready()
+
+
+_warm_up_lock = threading.Lock()
+
+
+def start_warm_up(state: StartupState = startup_state) -> Optional[threading.Thread]:
+    """Run `warm_up` on a daemon thread unless one is already in progress."""
+    if not _warm_up_lock.acquire(blocking=False):
+        return None
+
+    def run() -> None:
+        try:
+            warm_up(state)
+        finally:
+            _warm_up_lock.release()
+
+    thread = threading.Thread(target=run, name="artifact-warm-up", daemon=True)
+    thread.start()
+    return thread
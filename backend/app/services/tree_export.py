@@ -0,0 +1,196 @@
+"""
+Flat-array export of a trained LightGBM model and a NumPy evaluator for it.
+
+`export_trees` turns the booster's JSON dump into parallel node arrays
+(split feature, threshold, children, missing-value handling, leaf value)
+saved as `trees.npz`. `NumpyTreeEnsemble` walks every tree for every row
+at once with vectorized indexing, so the real model can be served with
+only numpy installed and gives the same predictions as LightGBM.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+TREES_FILE = "trees.npz"
+
+# LightGBM missing_type codes
+_MISSING_NONE, _MISSING_ZERO, _MISSING_NAN = 0, 1, 2
+_MISSING_TYPES = {"None": _MISSING_NONE, "Zero": _MISSING_ZERO, "NaN": _MISSING_NAN}
+# Values LightGBM treats as zero for missing_type=Zero
+_ZERO_THRESHOLD = 1e-35
+# Objectives whose raw score is a log-link and must be exponentiated
+_EXP_OBJECTIVES = ("poisson", "gamma", "tweedie")
+
+
+def _flatten_tree(node: Dict[str, Any], arrays: Dict[str, List], depth: int = 0) -> tuple[int, int]:
+    """Append `node` and its subtree to `arrays`; return (node index, subtree depth)."""
+    index = len(arrays["feature"])
+    if "leaf_value" in node or "split_feature" not in node:
+        arrays["feature"].append(-1)
+        arrays["threshold"].append(0.0)
+        arrays["left"].append(index)
+        arrays["right"].append(index)
+        arrays["default_left"].append(False)
+        arrays["missing_type"].append(_MISSING_NONE)
+        arrays["value"].append(float(node.get("leaf_value", 0.0)))
+        return index, depth
+
+    if node.get("decision_type", "<=") != "<=":
+        raise NotImplementedError("Categorical splits are not supported by the NumPy exporter")
+    arrays["feature"].append(int(node["split_feature"]))
+    arrays["threshold"].append(float(node["threshold"]))
+    arrays["left"].append(-1)
+    arrays["right"].append(-1)
+    arrays["default_left"].append(bool(node.get("default_left", True)))
+    arrays["missing_type"].append(_MISSING_TYPES.get(node.get("missing_type", "None"), _MISSING_NONE))
+    arrays["value"].append(0.0)
+
+    left, left_depth = _flatten_tree(node["left_child"], arrays, depth + 1)
+    right, right_depth = _flatten_tree(node["right_child"], arrays, depth + 1)
+    arrays["left"][index] = left
+    arrays["right"][index] = right
+    return index, max(left_depth, right_depth)
+
+
+def export_trees(model: Any, path: Optional[Path] = None) -> Dict[str, np.ndarray]:
+    """Convert a LightGBM model (Booster or LGBMRegressor) to flat node arrays.
+
+    Trees up to the booster's best iteration are exported, matching what
+    `Booster.predict` uses by default. Writes them to `path` (npz) if given.
+    """
+    booster = getattr(model, "booster_", model)
+    dump = booster.dump_model()
+    if dump.get("num_tree_per_iteration", 1) != 1:
+        raise NotImplementedError("Only single-output (regression) models can be exported")
+
+    arrays: Dict[str, List] = {
+        k: [] for k in ("feature", "threshold", "left", "right", "default_left", "missing_type", "value")
+    }
+    roots, depth = [], 0
+    for tree in dump["tree_info"]:
+        root, tree_depth = _flatten_tree(tree["tree_structure"], arrays)
+        roots.append(root)
+        depth = max(depth, tree_depth)
+
+    objective = str(dump.get("objective", "regression")).split(" ")[0]
+    exported = {
+        "feature": np.asarray(arrays["feature"], dtype=np.int32),
+        "threshold": np.asarray(arrays["threshold"], dtype=np.float64),
+        "left": np.asarray(arrays["left"], dtype=np.int32),
+        "right": np.asarray(arrays["right"], dtype=np.int32),
+        "default_left": np.asarray(arrays["default_left"], dtype=bool),
+        "missing_type": np.asarray(arrays["missing_type"], dtype=np.int8),
+        "value": np.asarray(arrays["value"], dtype=np.float64),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "max_depth": np.asarray(depth, dtype=np.int32),
+        "num_features": np.asarray(int(dump.get("max_feature_idx", -1)) + 1, dtype=np.int32),
+        "exp_output": np.asarray(objective in _EXP_OBJECTIVES),
+        "average_output": np.asarray(bool(dump.get("average_output", False))),
+    }
+    if path is not None:
+        np.savez(path, **exported)
+    return exported
+
+
+class NumpyTreeEnsemble:
+    """Evaluate exported trees for a whole feature matrix with NumPy.
+
+    All (row, tree) pairs descend one level per iteration, so the loop runs
+    `max_depth` times regardless of row or tree count.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.default_left = arrays["default_left"]
+        self.missing_type = arrays["missing_type"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.max_depth = int(arrays["max_depth"])
+        self.num_features = int(arrays["num_features"])
+        self.exp_output = bool(arrays["exp_output"])
+        self.average_output = bool(arrays["average_output"])
+
+    @classmethod
+    def load(cls, path: Path) -> "NumpyTreeEnsemble":
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def predict_matrix(self, X: np.ndarray, num_threads: Optional[int] = None) -> np.ndarray:
+        # LightGBM compares features as doubles, whatever the input dtype
+        X = np.asarray(X, dtype=np.float64)
+        n = X.shape[0]
+        if n == 0 or len(self.roots) == 0:
+            return np.zeros(n, dtype=float)
+
+        rows = np.arange(n)[:, None]
+        nodes = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            fval = X[rows, np.where(internal, feature, 0)]
+            missing_type = self.missing_type[nodes]
+            is_nan = np.isnan(fval)
+            # Outside missing_type=NaN, LightGBM reads NaN as 0.0
+            fval = np.where(is_nan & (missing_type != _MISSING_NAN), 0.0, fval)
+            use_default = ((missing_type == _MISSING_ZERO) & (np.abs(fval) <= _ZERO_THRESHOLD)) | (
+                (missing_type == _MISSING_NAN) & is_nan
+            )
+            with np.errstate(invalid="ignore"):
+                go_left = np.where(use_default, self.default_left[nodes], fval <= self.threshold[nodes])
+            nodes = np.where(internal, np.where(go_left, self.left[nodes], self.right[nodes]), nodes)
+
+        raw = self.value[nodes].sum(axis=1)
+        if self.average_output:
+            raw = raw / len(self.roots)
+        return np.exp(raw) if self.exp_output else raw
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.predict_matrix(X)
+
+
+def main() -> None:
+    import argparse
+
+    from app.services.artifact_store import MODEL_FILE, latest_version_dir
+
+    parser = argparse.ArgumentParser(description="Export a saved LightGBM artifact to NumPy tree arrays.")
+    parser.add_argument("version_dir", nargs="?", help="Artifact version directory (default: LATEST).")
+    args = parser.parse_args()
+
+    version_dir = Path(args.version_dir) if args.version_dir else latest_version_dir()
+    if version_dir is None:
+        raise SystemExit("No artifact version found.")
+
+    import lightgbm as lgb
+
+    from app.services.artifact_store import update_manifest
+    from app.services.shared_artifact import (
+        publish_shared_artifact,
+        shared_artifact_enabled,
+        unpublish_shared_artifact,
+    )
+
+    booster = lgb.Booster(model_file=str(version_dir / MODEL_FILE))
+    tmp_path = version_dir / f".{TREES_FILE}.tmp.npz"
+    export_trees(booster, tmp_path)
+    tmp_path.replace(version_dir / TREES_FILE)
+    # The loader only uses trees named in the manifest
+    update_manifest(version_dir, tree_export=TREES_FILE)
+    # shared/ holds a copy of the tree arrays, so rebuild it
+    unpublish_shared_artifact(version_dir)
+    if shared_artifact_enabled():
+        publish_shared_artifact(version_dir)
+    print(f"Exported trees to: {version_dir / TREES_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,16 @@
 from __future__ import annotations
 
 from pathlib import Path
-import joblib
 
-from app.data.bigquery_client import fetch_demand_with_context
+from app.data.demand_store import load_demand_history
+from app.services.artifact_store import save_artifact
 from app.services.fallback_model import SimpleModel, SimpleEncoder
 
 
 def create_artifact() -> Path:
-    df = fetch_demand_with_context()
+    df = load_demand_history()
     if df.empty:
-        raise RuntimeError("No data available from BigQuery to build fallback artifact.")
+        raise RuntimeError("No demand history available to build fallback artifact.")
 
     feature_cols = [
         "sku_encoded",
@@ -23,18 +23,13 @@ def create_artifact() -> Path:
         "price",
     ]
 
-    artifact = {
-        "model": SimpleModel(),
-        "feature_cols": feature_cols,
-        "sku_encoder": SimpleEncoder(df),
-        "history_df": df,
-    }
-
-    models_dir = Path(__file__).resolve().parent.parent / "models"
-    models_dir.mkdir(parents=True, exist_ok=True)
-    model_path = models_dir / "demand_model.joblib"
-    joblib.dump(artifact, model_path)
-    return model_path
+    return save_artifact(
+        model=SimpleModel(),
+        feature_cols=feature_cols,
+        sku_encoder=SimpleEncoder(df),
+        history_df=df,
+        fallback=True,
+    )
 
 
 def main():
@@ -0,0 +1,174 @@
+"""
+On-disk cache of binned LightGBM Datasets for the demand model.
+
+Constructing a Dataset bins every feature column, which is a large share
+of fit time on long histories. Each entry stores the train/val Datasets in
+LightGBM's binary format together with the feature list, the SKU encoder
+classes and the raw validation matrix (binary Datasets keep no raw data),
+under a key hashing the prepared feature matrices and targets. A rerun on
+unchanged data reloads the bins instead of recomputing them, and any change
+to the data or to the feature layout `prepare_xy` produces rebuilds them.
+
+This is the only implementation: the pipeline scripts in backend/src use
+it through src/dataset_cache.py.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "dataset_cache"
+# Bump when the cached layout or the Dataset construction changes
+CACHE_FORMAT = 2
+# Fixed at binning time; feature_pre_filter=False lets training vary
+# min_data_in_leaf against the same bins
+DATASET_PARAMS = {"feature_pre_filter": False, "verbose": -1}
+KEEP_ENTRIES = 3
+
+
+@dataclass
+class CachedDatasets:
+    """Binned train/val Datasets plus what is needed to use them.
+
+    `train_path`/`val_path` are the binary files, so worker processes can
+    load the same bins; `X_val`/`y_val` are kept as arrays for scoring.
+    """
+
+    train: Any
+    val: Any
+    train_path: Path
+    val_path: Path
+    X_val: np.ndarray
+    y_val: np.ndarray
+    feature_cols: List[str]
+    sku_encoder: Any
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Hash a frame's columns, dtypes and row values (not its index)."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def dataset_cache_key(
+    X_train: pd.DataFrame, y_train: np.ndarray, X_val: pd.DataFrame, y_val: np.ndarray
+) -> str:
+    """Hash exactly what gets binned, so the key follows the feature layout."""
+    payload = {
+        "format": CACHE_FORMAT,
+        "dataset_params": DATASET_PARAMS,
+        "features": [frame_fingerprint(X_train), frame_fingerprint(X_val)],
+        "targets": [
+            hashlib.sha256(np.ascontiguousarray(y, dtype=float).tobytes()).hexdigest()
+            for y in (y_train, y_val)
+        ],
+    }
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _load_entry(entry_dir: Path) -> CachedDatasets:
+    import lightgbm as lgb
+
+    from app.services.artifact_store import JsonLabelEncoder
+
+    with (entry_dir / "meta.json").open("r") as f:
+        meta = json.load(f)
+    train_path = entry_dir / "train.bin"
+    val_path = entry_dir / "val.bin"
+    train_set = lgb.Dataset(str(train_path), params=DATASET_PARAMS)
+    val_set = lgb.Dataset(str(val_path), reference=train_set, params=DATASET_PARAMS)
+    return CachedDatasets(
+        train=train_set,
+        val=val_set,
+        train_path=train_path,
+        val_path=val_path,
+        X_val=np.load(entry_dir / "X_val.npy"),
+        y_val=np.load(entry_dir / "y_val.npy"),
+        feature_cols=meta["feature_cols"],
+        sku_encoder=JsonLabelEncoder.from_json(meta["sku_encoder"]),
+    )
+
+
+def _build_entry(
+    entry_dir: Path,
+    X_train: pd.DataFrame,
+    y_train: np.ndarray,
+    X_val: pd.DataFrame,
+    y_val: np.ndarray,
+    feature_cols: List[str],
+    sku_encoder: Any,
+) -> None:
+    import lightgbm as lgb
+
+    from app.services.artifact_store import JsonLabelEncoder
+
+    tmp_dir = entry_dir.with_name(f".{entry_dir.name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    train_set = lgb.Dataset(X_train, label=y_train, params=DATASET_PARAMS)
+    val_set = lgb.Dataset(X_val, label=y_val, reference=train_set, params=DATASET_PARAMS)
+    train_set.save_binary(str(tmp_dir / "train.bin"))
+    val_set.save_binary(str(tmp_dir / "val.bin"))
+    np.save(tmp_dir / "X_val.npy", X_val.to_numpy(dtype=float))
+    np.save(tmp_dir / "y_val.npy", np.asarray(y_val, dtype=float))
+    with (tmp_dir / "meta.json").open("w") as f:
+        json.dump(
+            {
+                "feature_cols": list(feature_cols),
+                "sku_encoder": JsonLabelEncoder.from_encoder(sku_encoder).to_json(),
+            },
+            f,
+            indent=2,
+        )
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    tmp_dir.replace(entry_dir)
+
+
+def _prune(cache_dir: Path, keep: int, current: Path) -> None:
+    entries = sorted(
+        (p for p in cache_dir.iterdir() if p.is_dir() and not p.name.startswith(".")),
+        key=lambda p: p.stat().st_mtime,
+    )
+    for path in entries[: max(len(entries) - keep, 0)]:
+        if path != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_or_build_datasets(
+    train_df: pd.DataFrame,
+    val_df: pd.DataFrame,
+    prepare_xy: Callable,
+    cache_dir: Path = CACHE_DIR,
+) -> CachedDatasets:
+    """Return binned Datasets for the split, building and caching them on a miss.
+
+    `prepare_xy(df, sku_encoder=None)` must return (X, y, feature_cols,
+    sku_encoder); the validation frame is encoded with the training
+    encoder. Preparing X is cheap next to binning it, so it runs on every
+    call and the key is taken from its result.
+    """
+    X_train, y_train, feature_cols, sku_encoder = prepare_xy(train_df)
+    X_val, y_val, _, _ = prepare_xy(val_df, sku_encoder=sku_encoder)
+
+    entry_dir = cache_dir / dataset_cache_key(X_train, y_train, X_val, y_val)
+    if (entry_dir / "meta.json").exists():
+        entry_dir.touch()
+        logging.info("Reusing binned datasets from %s", entry_dir)
+    else:
+        _build_entry(entry_dir, X_train, y_train, X_val, y_val, feature_cols, sku_encoder)
+        logging.info("Built binned datasets in %s", entry_dir)
+    _prune(cache_dir, KEEP_ENTRIES, entry_dir)
+    return _load_entry(entry_dir)
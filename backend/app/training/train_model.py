@@ -3,16 +3,18 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import timedelta
 from pathlib import Path
+from typing import Any, Optional
 
-import joblib
+import lightgbm as lgb
 import numpy as np
 import pandas as pd
-from lightgbm import LGBMRegressor
 from sklearn.metrics import mean_absolute_error
 from sklearn.preprocessing import LabelEncoder
 
-from app.data.bigquery_client import fetch_demand_with_context
+from app.data.demand_store import load_demand_history
+from app.services.artifact_store import save_artifact
 from app.features.feature_engineering import build_time_series_features
+from app.training.dataset_cache import DATASET_PARAMS, load_or_build_datasets
 
 
 @dataclass
@@ -21,6 +23,9 @@ class TrainConfig:
     random_state: int = 42
     num_boost_round: int = 500
     early_stopping_rounds: int = 50
+    # Reload binned LightGBM Datasets from data/dataset_cache when the
+    # prepared feature matrices are unchanged
+    use_dataset_cache: bool = True
 
 
 def time_based_train_val_split(df: pd.DataFrame, val_days: int) -> tuple[pd.DataFrame, pd.DataFrame]:
@@ -32,7 +37,9 @@ def time_based_train_val_split(df: pd.DataFrame, val_days: int) -> tuple[pd.Data
     return train, val
 
 
-def prepare_xy(df: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray, list[str], LabelEncoder]:
+def prepare_xy(
+    df: pd.DataFrame, sku_encoder: Optional[Any] = None
+) -> tuple[pd.DataFrame, np.ndarray, list[str], Any]:
     """
     Build the feature matrix from the enriched feature frame.
 
@@ -42,11 +49,19 @@ def prepare_xy(df: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray, list[str], L
       - lag and rolling features
       - numeric context features (event_count, active_users, price)
       - optional product_category encoding
+
+    Pass the training `sku_encoder` when preparing validation rows so both
+    share one encoding; SKUs it has not seen are encoded as -1.
     """
     df = df.dropna(subset=["total_quantity"]).copy()
 
-    le = LabelEncoder()
-    df["sku_encoded"] = le.fit_transform(df["sku"].astype(str))
+    if sku_encoder is None:
+        le = LabelEncoder()
+        df["sku_encoded"] = le.fit_transform(df["sku"].astype(str))
+    else:
+        le = sku_encoder
+        codes = {str(label): i for i, label in enumerate(le.classes_)}
+        df["sku_encoded"] = df["sku"].astype(str).map(codes).fillna(-1).astype(int)
 
     feature_cols: list[str] = ["sku_encoded", "day_of_week", "month"]
 
@@ -75,48 +90,50 @@ def prepare_xy(df: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray, list[str], L
 
 
 def train_model(cfg: TrainConfig) -> Path:
-    raw_df = fetch_demand_with_context()
+    raw_df = load_demand_history()
     if raw_df.empty:
-        raise RuntimeError("No data returned from BigQuery 'orders' table.")
+        raise RuntimeError("No demand history available (BigQuery sync and local store are empty).")
 
     history_df = raw_df.copy()
     features_df = build_time_series_features(history_df)
 
     train_df, val_df = time_based_train_val_split(features_df, cfg.val_days)
 
-    X_train, y_train, feature_cols, le = prepare_xy(train_df)
-    X_val, y_val, _, _ = prepare_xy(val_df)
-
-    model = LGBMRegressor(
-        n_estimators=cfg.num_boost_round,
-        random_state=cfg.random_state,
-        objective="regression",
-    )
-    # LightGBM sklearn API in this version does not accept early_stopping_rounds directly;
-    # rely on n_estimators and validation to tune capacity offline.
-    model.fit(
-        X_train,
-        y_train,
-        eval_set=[(X_val, y_val)],
-        eval_metric="l2",
+    params = {
+        "objective": "regression",
+        "metric": "l2",
+        "seed": cfg.random_state,
+        "verbose": -1,
+    }
+    if cfg.use_dataset_cache:
+        datasets = load_or_build_datasets(train_df, val_df, prepare_xy)
+        train_set, val_set = datasets.train, datasets.val
+        X_val, y_val = datasets.X_val, datasets.y_val
+        feature_cols, le = datasets.feature_cols, datasets.sku_encoder
+    else:
+        X_train, y_train, feature_cols, le = prepare_xy(train_df)
+        X_val, y_val, _, _ = prepare_xy(val_df, sku_encoder=le)
+        train_set = lgb.Dataset(X_train, label=y_train, params=DATASET_PARAMS)
+        val_set = lgb.Dataset(X_val, label=y_val, reference=train_set, params=DATASET_PARAMS)
+
+    model = lgb.train(
+        params,
+        train_set,
+        num_boost_round=cfg.num_boost_round,
+        valid_sets=[val_set],
+        callbacks=[lgb.early_stopping(cfg.early_stopping_rounds, verbose=False)],
     )
 
     val_pred = model.predict(X_val)
     val_mae = mean_absolute_error(y_val, val_pred)
 
-    artifact = {
-        "model": model,
-        "feature_cols": feature_cols,
-        "sku_encoder": le,
-        "history_df": history_df,  # used for forecasting bootstrap
-        "val_mae": float(val_mae),
-    }
-
-    models_dir = Path("backend/app/models")
-    models_dir.mkdir(parents=True, exist_ok=True)
-    model_path = models_dir / "demand_model.joblib"
-    joblib.dump(artifact, model_path)
-    return model_path
+    return save_artifact(
+        model=model,
+        feature_cols=feature_cols,
+        sku_encoder=le,
+        history_df=history_df,  # used for forecasting bootstrap
+        metadata={"val_mae": float(val_mae)},
+    )
 
 
 def main() -> None:
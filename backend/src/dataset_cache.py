@@ -0,0 +1,56 @@
+import sys
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+# The cache itself lives in the app package so training here and in the API
+# share one implementation; expose backend/ when run as backend/src/*.py
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.training import dataset_cache  # noqa: E402
+from app.training.dataset_cache import DATASET_PARAMS, CachedDatasets  # noqa: E402
+
+__all__ = ["DATASET_PARAMS", "CachedDatasets", "default_cache_dir", "load_or_build_datasets"]
+
+
+def default_cache_dir(cfg: dict) -> Path:
+    paths = cfg["paths"]
+    return Path(paths.get("dataset_cache_dir") or Path(paths["features_data_dir"]) / "dataset_cache")
+
+
+def load_or_build_datasets(
+    train_path: Path,
+    val_path: Path,
+    cfg: dict,
+    prepare_xy: Callable,
+    cache_dir: Optional[Path] = None,
+) -> CachedDatasets:
+    """Return binned Datasets for the train/val parquet splits.
+
+    Thin adapter over app.training.dataset_cache: `prepare_xy(df, cfg,
+    sku_le=None)` turns a split into (X, y, feature_cols, sku_le), and the
+    returned `sku_encoder` is a plain sklearn LabelEncoder so the joblib
+    artifacts stay loadable without the app package. train.py and tune.py
+    share one entry per prepared feature layout.
+    """
+    date_col = cfg["data"]["date_column"]
+    train_df = pd.read_parquet(train_path)
+    val_df = pd.read_parquet(val_path)
+    train_df[date_col] = pd.to_datetime(train_df[date_col])
+    val_df[date_col] = pd.to_datetime(val_df[date_col])
+
+    datasets = dataset_cache.load_or_build_datasets(
+        train_df,
+        val_df,
+        lambda df, sku_encoder=None: prepare_xy(df, cfg, sku_le=sku_encoder),
+        cache_dir=cache_dir or default_cache_dir(cfg),
+    )
+    sku_le = LabelEncoder()
+    sku_le.classes_ = np.asarray(datasets.sku_encoder.classes_, dtype=object)
+    return replace(datasets, sku_encoder=sku_le)
@@ -1,8 +1,19 @@
+import shutil
+import sys
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
 import yaml
 
+# lag_rolling_features lives in the app package so the pipeline and the
+# API build identical features; expose backend/ when run as backend/src/*.py
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.features.feature_engineering import lag_rolling_features  # noqa: E402
+
 
 def load_config(config_path: Path) -> dict:
     with config_path.open("r") as f:
@@ -27,23 +38,229 @@ def build_features(
 
     df = df.sort_values(by=[sku_column, date_column])
 
-    # Generate lag features
-    for lag in lags:
-        df[f"{target_column}_lag_{lag}"] = df.groupby(sku_column)[target_column].shift(
-            lag
-        )
+    features = lag_rolling_features(
+        df[sku_column].to_numpy(),
+        df[target_column].to_numpy(dtype=float),
+        lags,
+        rolling_mean_windows,
+    )
+    for name, values in features.items():
+        df[f"{target_column}_{name}"] = values
+
+    output_path = output_dir / "features.parquet"
+    _remove_output(output_path)
+    df.to_parquet(output_path, index=False)
+    return output_path
+
+
+def _remove_output(path: Path) -> None:
+    # features.parquet is a file for in-memory builds and a directory of
+    # part files for streaming ones
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def _features_after_context(
+    context: Optional[pd.DataFrame],
+    new_rows: pd.DataFrame,
+    date_column: str,
+    sku_column: str,
+    target_column: str,
+    lags: list[int],
+    rolling_mean_windows: list[int],
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Compute features for `new_rows` given earlier rows of the same SKUs.
+
+    Returns (features of the new rows only, context + new rows sorted by
+    SKU and date, without feature columns).
+    """
+    n_context = 0 if context is None else len(context)
+    df = new_rows if context is None else pd.concat([context, new_rows], ignore_index=True)
+    df = df.sort_values(by=[sku_column, date_column])
+    is_new = df.index.to_numpy() >= n_context
+    combined = df.reset_index(drop=True)
 
-    # Generate rolling mean features
-    for window in rolling_mean_windows:
-        df[f"{target_column}_rolling_mean_{window}"] = (
-            df.groupby(sku_column)[target_column]
-            .shift(1)
-            .rolling(window=window)
-            .mean()
+    features = lag_rolling_features(
+        df[sku_column].to_numpy(),
+        df[target_column].to_numpy(dtype=float),
+        lags,
+        rolling_mean_windows,
+    )
+    df = df.copy()
+    for name, values in features.items():
+        df[f"{target_column}_{name}"] = values
+    return df[is_new], combined
+
+
+def build_features_streaming(
+    input_parquet: Path,
+    output_dir: Path,
+    date_column: str,
+    sku_column: str,
+    target_column: str,
+    lags: list[int],
+    rolling_mean_windows: list[int],
+    batch_rows: int = 1_000_000,
+) -> Path:
+    """
+    Build the same features as `build_features` without loading the whole history.
+
+    sales.parquet is read in record batches of `batch_rows`; it must be
+    sorted by date, as ingest.py writes it. Each batch is prefixed with the
+    last max(lags + windows) rows of every SKU seen so far, which is all the
+    history a lag or rolling mean can reach, and only the batch's own rows
+    are written. The output is a directory of part files, one per batch,
+    which pandas and pyarrow read back as a single dataset. Memory stays
+    bounded by one batch plus the carried tails.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / "features.parquet"
+    tmp_path = output_dir / ".features.parquet.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir()
+
+    lookback = max([1, *lags, *rolling_mean_windows])
+    tail = None
+    schema = None
+    last_date = None
+    source = pq.ParquetFile(input_parquet)
+    for part, batch in enumerate(source.iter_batches(batch_size=batch_rows)):
+        chunk = batch.to_pandas()
+        chunk[date_column] = pd.to_datetime(chunk[date_column])
+        if last_date is not None and chunk[date_column].min() < last_date:
+            raise ValueError(
+                f"{input_parquet} is not sorted by {date_column}; "
+                "re-run ingest.py or build features in memory."
+            )
+        last_date = chunk[date_column].max()
+
+        new_features, combined = _features_after_context(
+            tail, chunk, date_column, sku_column, target_column, lags, rolling_mean_windows
         )
 
+        table = pa.Table.from_pandas(new_features, preserve_index=False)
+        if schema is None:
+            schema = table.schema
+        elif not table.schema.equals(schema):
+            # e.g. an int column that holds nulls in only some batches
+            table = table.cast(schema)
+        pq.write_table(table, tmp_path / f"part-{part:05d}.parquet")
+
+        tail = combined.groupby(sku_column, sort=False).tail(lookback).reset_index(drop=True)
+
+    _remove_output(output_path)
+    tmp_path.replace(output_path)
+    return output_path
+
+
+def _feature_parts(path: Path) -> list[Path]:
+    return sorted(path.glob("part-*.parquet"))
+
+
+def _as_partitioned(path: Path) -> None:
+    """Turn a single-file features.parquet into a directory holding it as part 0."""
+    if path.is_dir():
+        return
+    moved = path.with_name(f".{path.name}.part-00000")
+    path.replace(moved)
+    path.mkdir()
+    moved.replace(path / "part-00000.parquet")
+
+
+def update_features(
+    input_parquet: Path,
+    output_dir: Path,
+    date_column: str,
+    sku_column: str,
+    target_column: str,
+    lags: list[int],
+    rolling_mean_windows: list[int],
+) -> Path:
+    """
+    Append features for days in sales.parquet newer than features.parquet.
+
+    Only sales rows dated after the last featurized day are read. Their
+    lags and rolling means need at most the last max(lags + windows) rows
+    of each SKU, so the existing features are read back for that many
+    days before the new data (plus older rows for SKUs with gaps in that
+    span) and the recomputed new rows are written as one more part file.
+    Earlier rows are never rewritten: corrections to days that were
+    already featurized need a full rebuild. Falls back to a full build if
+    there are no features yet.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
     output_path = output_dir / "features.parquet"
-    df.to_parquet(output_path, index=False)
+    if not output_path.exists():
+        return build_features(
+            input_parquet, output_dir, date_column, sku_column, target_column, lags, rolling_mean_windows
+        )
+
+    expected = [f"{target_column}_lag_{lag}" for lag in lags] + [
+        f"{target_column}_rolling_mean_{window}" for window in rolling_mean_windows
+    ]
+    existing_schema = pq.read_schema(
+        output_path if output_path.is_file() else _feature_parts(output_path)[0]
+    )
+    feature_names = [
+        name
+        for name in existing_schema.names
+        if name.startswith(f"{target_column}_lag_") or name.startswith(f"{target_column}_rolling_mean_")
+    ]
+    if feature_names != expected:
+        raise ValueError(
+            f"{output_path} has features {feature_names}, config expects {expected}; "
+            "rebuild features without --incremental."
+        )
+    source_columns = [name for name in existing_schema.names if name not in set(expected)]
+
+    last_date = pc.max(pq.read_table(output_path, columns=[date_column])[date_column]).as_py()
+    new_rows = pd.read_parquet(input_parquet, filters=[(date_column, ">", last_date)])
+    if new_rows.empty:
+        return output_path
+    new_rows[date_column] = pd.to_datetime(new_rows[date_column])
+    new_rows = new_rows[source_columns]
+
+    # With daily rows the last `lookback` rows of a SKU fall in the last
+    # `lookback` days; SKUs with gaps there are topped up from older rows.
+    lookback = max([1, *lags, *rolling_mean_windows])
+    cutoff = pd.Timestamp(new_rows[date_column].min()) - pd.Timedelta(days=lookback)
+    context = pd.read_parquet(output_path, columns=source_columns, filters=[(date_column, ">=", cutoff)])
+    counts = context[sku_column].value_counts()
+    skus = pd.unique(new_rows[sku_column])
+    short = [sku for sku in skus if counts.get(sku, 0) < lookback]
+    if short:
+        older = pd.read_parquet(
+            output_path,
+            columns=source_columns,
+            filters=[(date_column, "<", cutoff), (sku_column, "in", short)],
+        )
+        context = pd.concat([older, context], ignore_index=True)
+    context = context[context[sku_column].isin(skus)]
+    context = context.sort_values(by=[sku_column, date_column])
+    context = context.groupby(sku_column, sort=False).tail(lookback)
+    context[date_column] = pd.to_datetime(context[date_column])
+
+    new_features, _ = _features_after_context(
+        context, new_rows, date_column, sku_column, target_column, lags, rolling_mean_windows
+    )
+
+    table = pa.Table.from_pandas(new_features, preserve_index=False)
+    table = table.select(existing_schema.names).cast(existing_schema)
+    _as_partitioned(output_path)
+    parts = _feature_parts(output_path)
+    next_part = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+    part_path = output_path / f"part-{next_part:05d}.parquet"
+    tmp_part = output_path / f".{part_path.name}.tmp"
+    pq.write_table(table, tmp_part)
+    tmp_part.replace(part_path)
     return output_path
 
 
@@ -57,6 +274,16 @@ def main():
         default="backend/configs/model.yaml",
         help="Path to YAML config file.",
     )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Build features batch by batch instead of loading sales.parquet at once.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only add features for days newer than the existing features.parquet.",
+    )
     args = parser.parse_args()
 
     config_path = Path(args.config)
@@ -76,15 +303,37 @@ def main():
             f"Processed parquet not found: {input_parquet}. Run ingest first."
         )
 
-    output_path = build_features(
-        input_parquet=input_parquet,
-        output_dir=features_dir,
-        date_column=date_col,
-        sku_column=sku_col,
-        target_column=target_col,
-        lags=lags,
-        rolling_mean_windows=rolling_windows,
-    )
+    if args.incremental:
+        output_path = update_features(
+            input_parquet=input_parquet,
+            output_dir=features_dir,
+            date_column=date_col,
+            sku_column=sku_col,
+            target_column=target_col,
+            lags=lags,
+            rolling_mean_windows=rolling_windows,
+        )
+    elif args.streaming or cfg["features"].get("streaming", False):
+        output_path = build_features_streaming(
+            input_parquet=input_parquet,
+            output_dir=features_dir,
+            date_column=date_col,
+            sku_column=sku_col,
+            target_column=target_col,
+            lags=lags,
+            rolling_mean_windows=rolling_windows,
+            batch_rows=cfg["features"].get("stream_batch_rows", 1_000_000),
+        )
+    else:
+        output_path = build_features(
+            input_parquet=input_parquet,
+            output_dir=features_dir,
+            date_column=date_col,
+            sku_column=sku_col,
+            target_column=target_col,
+            lags=lags,
+            rolling_mean_windows=rolling_windows,
+        )
 
     print(f"Feature data written to: {output_path}")
 
@@ -1,19 +1,29 @@
-from datetime import timedelta
+import sys
 from pathlib import Path
 from typing import List
 
 import joblib
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import yaml
 
+# LagState lives in the app package so batch and live forecasts advance the
+# same way; expose backend/ when run as backend/src/*.py
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.features.lag_state import LagState  # noqa: E402
+
 
 def load_config(config_path: Path) -> dict:
     with config_path.open("r") as f:
         return yaml.safe_load(f)
 
 
-def load_model_artifact(cfg: dict) -> dict:
+def model_artifact_path(cfg: dict) -> Path:
     tuned_model_dir = Path(cfg["paths"]["tuned_model_dir"])
     normal_model_dir = Path(cfg["paths"]["normal_model_dir"])
 
@@ -21,22 +31,34 @@ def load_model_artifact(cfg: dict) -> dict:
     normal_model_path = normal_model_dir / "model.joblib"
 
     if tuned_model_path.exists():
-        return joblib.load(tuned_model_path)
+        return tuned_model_path
     if normal_model_path.exists():
-        return joblib.load(normal_model_path)
+        return normal_model_path
 
     raise FileNotFoundError("No trained model artifact found (normal or tuned).")
 
 
-def iterative_forecast_for_sku(
+def load_model_artifact(cfg: dict) -> dict:
+    return joblib.load(model_artifact_path(cfg))
+
+
+def model_version(path: Path) -> str:
+    """Identify a model file the way the API identifies its serving artifact."""
+    stat = path.stat()
+    return f"{path.name}:{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def iterative_forecast_for_skus(
     history_df: pd.DataFrame,
-    sku: str,
+    skus: List[str],
     artifact: dict,
     cfg: dict,
     horizon: int,
 ) -> pd.DataFrame:
     """
-    Simple autoregressive forecasting loop using lag/rolling features.
+    Batched autoregressive forecasting loop using lag/rolling features.
+    All SKUs advance one step at a time with a single model.predict call on
+    an (n_skus x n_features) matrix per step.
     Assumes exogenous variables (price, promo) remain constant at last observed values.
     """
     date_col = cfg["data"]["date_column"]
@@ -46,73 +68,88 @@ def iterative_forecast_for_sku(
 
     lags: List[int] = cfg["features"]["lags"]
     rolling_windows: List[int] = cfg["features"]["rolling_mean_windows"]
+    max_lag = max(lags + rolling_windows)
 
-    sku_history = history_df[history_df[sku_col] == sku].copy()
-    if sku_history.empty:
-        raise ValueError(f"No history found for SKU '{sku}'.")
-
+    sku_history = history_df[history_df[sku_col].isin(skus)].copy()
     sku_history[date_col] = pd.to_datetime(sku_history[date_col])
-    sku_history = sku_history.sort_values(by=[date_col])
+    sku_history = sku_history.sort_values(by=[sku_col, date_col], kind="stable")
+    groups = {sku: g for sku, g in sku_history.groupby(sku_col, sort=False)}
+
+    for sku in skus:
+        if sku not in groups:
+            raise ValueError(f"No history found for SKU '{sku}'.")
 
-    last_date = sku_history[date_col].max()
-    last_row = sku_history.iloc[-1].copy()
+    n = len(skus)
+    feature_cols = artifact["feature_cols"]
+    col_index = {c: i for i, c in enumerate(feature_cols)}
 
     # Use label encoder from artifact
     le = artifact["sku_label_encoder"]
-    encoded_sku = le.transform([sku])[0]
-
-    # Keep a list of synthetic future rows
-    future_records = []
-
-    # Maintain rolling window of recent target values for computing lags/rolling
-    recent_targets = list(
-        sku_history.sort_values(by=[date_col])[target_col].values[-max(lags + rolling_windows) :]
-    )
-
-    for step in range(1, horizon + 1):
-        forecast_date = last_date + timedelta(days=step)
-
-        # Build feature row
-        feature_row = {}
+    encoded_skus = le.transform(skus)
+
+    # Recent target values for computing lags/rolling. Short histories are
+    # left-padded with NaN, which LightGBM treats as missing.
+    recent_targets = np.full((n, max_lag), np.nan)
+    last_dates = np.empty(n, dtype="datetime64[ns]")
+    X_input = np.zeros((n, len(feature_cols)))
+    for i, sku in enumerate(skus):
+        g = groups[sku]
+        values = g[target_col].to_numpy(dtype=float)[-max_lag:]
+        recent_targets[i, max_lag - len(values) :] = values
+        last_dates[i] = g[date_col].to_numpy()[-1]
         # Exogenous variables: hold last observed values
+        last_row = g.iloc[-1]
         for col in extra_features:
-            feature_row[col] = last_row[col]
+            X_input[i, col_index[col]] = last_row[col]
+    X_input[:, col_index[sku_col]] = encoded_skus
 
-        feature_row[sku_col] = encoded_sku
-
-        # Compute lags based on recent_targets (which include previous forecasts)
+    model = artifact["model"]
+    state = LagState(recent_targets, lags, rolling_windows)
+    forecasts = np.empty((n, horizon))
+    for step in range(1, horizon + 1):
+        # Compute lags based on recent targets (which include previous forecasts)
         for lag in lags:
-            feature_row[f"{target_col}_lag_{lag}"] = recent_targets[-lag]
+            X_input[:, col_index[f"{target_col}_lag_{lag}"]] = state.lag(lag)
 
-        # Rolling means
+        # Rolling means (over whatever history is available when short)
         for window in rolling_windows:
-            if len(recent_targets) >= window:
-                feature_row[f"{target_col}_rolling_mean_{window}"] = float(
-                    np.mean(recent_targets[-window:])
-                )
-            else:
-                feature_row[f"{target_col}_rolling_mean_{window}"] = float(
-                    np.mean(recent_targets)
-                )
-
-        feature_cols = artifact["feature_cols"]
-        X_input = np.array([[feature_row[col] for col in feature_cols]])
-
-        model = artifact["model"]
-        y_pred = float(model.predict(X_input)[0])
-
-        # Append prediction to recent_targets for next step
-        recent_targets.append(y_pred)
-
-        future_records.append(
-            {
-                date_col: forecast_date,
-                sku_col: sku,
-                "forecast": y_pred,
-            }
-        )
+            X_input[:, col_index[f"{target_col}_rolling_mean_{window}"]] = (
+                state.rolling_mean(window)
+            )
+
+        y_pred = np.asarray(model.predict(X_input), dtype=float)
+
+        # Push predictions into the state for the next step
+        state.push(y_pred)
+        forecasts[:, step - 1] = y_pred
+
+    step_offsets = np.arange(1, horizon + 1) * np.timedelta64(1, "D")
+    return pd.DataFrame(
+        {
+            date_col: (last_dates[:, None] + step_offsets[None, :]).ravel(),
+            sku_col: np.repeat(np.asarray(skus, dtype=object), horizon),
+            "forecast": forecasts.ravel(),
+        }
+    )
 
-    return pd.DataFrame(future_records)
+
+def iterative_forecast_for_sku(
+    history_df: pd.DataFrame,
+    sku: str,
+    artifact: dict,
+    cfg: dict,
+    horizon: int,
+) -> pd.DataFrame:
+    """
+    Simple autoregressive forecasting loop for a single SKU.
+    """
+    return iterative_forecast_for_skus(
+        history_df=history_df,
+        skus=[sku],
+        artifact=artifact,
+        cfg=cfg,
+        horizon=horizon,
+    )
 
 
 def main():
@@ -128,8 +165,8 @@ def main():
     parser.add_argument(
         "--horizon",
         type=int,
-        default=14,
-        help="Forecast horizon in days.",
+        default=None,
+        help="Forecast horizon in days (default: every horizon in forecast.default_horizons).",
     )
     args = parser.parse_args()
 
@@ -148,28 +185,43 @@ def main():
     history_df = pd.read_parquet(features_path)
     history_df[date_col] = pd.to_datetime(history_df[date_col])
 
-    artifact = load_model_artifact(cfg)
+    artifact_path = model_artifact_path(cfg)
+    artifact = joblib.load(artifact_path)
 
     forecast_dir.mkdir(parents=True, exist_ok=True)
 
-    all_skus = sorted(history_df[sku_col].unique())
-    all_forecasts = []
-    for sku in all_skus:
-        sku_forecast = iterative_forecast_for_sku(
-            history_df=history_df,
-            sku=sku,
-            artifact=artifact,
-            cfg=cfg,
-            horizon=args.horizon,
-        )
-        all_forecasts.append(sku_forecast)
-
-    result_df = pd.concat(all_forecasts, ignore_index=True)
-    output_path = forecast_dir / f"forecasts_h{args.horizon}.parquet"
-    result_df.to_parquet(output_path, index=False)
-
-    print(f"Batch forecasts for all SKUs written to: {output_path}")
+    horizons = [args.horizon] if args.horizon else cfg["forecast"]["default_horizons"]
+    max_horizon = max(horizons)
 
+    # Forecasts are autoregressive, so shorter horizons are prefixes of the
+    # longest one: run the model once and slice per horizon.
+    all_skus = sorted(history_df[sku_col].unique())
+    result_df = iterative_forecast_for_skus(
+        history_df=history_df,
+        skus=all_skus,
+        artifact=artifact,
+        cfg=cfg,
+        horizon=max_horizon,
+    )
+    steps = np.tile(np.arange(1, max_horizon + 1), len(all_skus))
+
+    # The API only serves a table built by its current model from the
+    # history it holds (see app/services/precomputed.py)
+    metadata = {
+        b"forecast.model_version": model_version(artifact_path).encode(),
+        b"forecast.as_of": str(history_df[date_col].max().date()).encode(),
+    }
+
+    for horizon in horizons:
+        output_path = forecast_dir / f"forecasts_h{horizon}.parquet"
+        table = pa.Table.from_pandas(result_df[steps <= horizon], preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+        # Write then rename so the API never reads a half-written file
+        tmp_path = output_path.with_suffix(".parquet.tmp")
+        pq.write_table(table, tmp_path)
+        tmp_path.replace(output_path)
+
+        print(f"Batch forecasts for all SKUs written to: {output_path}")
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,16 @@
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
 
 import joblib
+import lightgbm as lgb
 import numpy as np
 import pandas as pd
 import yaml
-from lightgbm import LGBMRegressor
+from sklearn.metrics import mean_absolute_error
 from sklearn.preprocessing import LabelEncoder
 
+from dataset_cache import CachedDatasets, load_or_build_datasets
+
 
 def load_config(config_path: Path) -> dict:
     with config_path.open("r") as f:
@@ -17,7 +20,8 @@ def load_config(config_path: Path) -> dict:
 def prepare_xy(
     df: pd.DataFrame,
     cfg: dict,
-) -> Tuple[pd.DataFrame, np.ndarray, list[str]]:
+    sku_le: Optional[LabelEncoder] = None,
+) -> Tuple[pd.DataFrame, np.ndarray, list[str], LabelEncoder]:
     target_col = cfg["data"]["target_column"]
     date_col = cfg["data"]["date_column"]
     sku_col = cfg["data"]["sku_column"]
@@ -26,9 +30,14 @@ def prepare_xy(
     # Drop rows with NaNs introduced by lags/rolling
     df = df.dropna().copy()
 
-    # Encode SKU as categorical integer
-    sku_le = LabelEncoder()
-    df[sku_col] = sku_le.fit_transform(df[sku_col].astype(str))
+    # Encode SKU as categorical integer; validation reuses the training
+    # encoder and maps unseen SKUs to -1
+    if sku_le is None:
+        sku_le = LabelEncoder()
+        df[sku_col] = sku_le.fit_transform(df[sku_col].astype(str))
+    else:
+        codes = {label: i for i, label in enumerate(sku_le.classes_)}
+        df[sku_col] = df[sku_col].astype(str).map(codes).fillna(-1).astype(int)
 
     feature_cols: list[str] = []
     feature_cols.extend(extra_features)
@@ -50,41 +59,38 @@ def prepare_xy(
 
 
 def train_model(
-    train_df: pd.DataFrame,
-    val_df: pd.DataFrame,
+    datasets: CachedDatasets,
     cfg: dict,
     model_dir: Path,
 ) -> Path:
     model_dir.mkdir(parents=True, exist_ok=True)
 
-    X_train, y_train, feature_cols, sku_le = prepare_xy(train_df, cfg)
-    X_val, y_val, _, _ = prepare_xy(val_df, cfg)
-
     train_cfg = cfg["training"]
     random_state = train_cfg.get("random_state", 42)
     num_boost_round = train_cfg.get("num_boost_round", 1000)
     early_stopping_rounds = train_cfg.get("early_stopping_rounds", 50)
 
-    model = LGBMRegressor(
-        n_estimators=num_boost_round,
-        random_state=random_state,
-        objective="regression",
-    )
-
-    model.fit(
-        X_train,
-        y_train,
-        eval_set=[(X_val, y_val)],
-        eval_metric="l2",
-        callbacks=None,
-        early_stopping_rounds=early_stopping_rounds,
+    params = {
+        "objective": "regression",
+        "metric": "l2",
+        "seed": random_state,
+        "verbose": -1,
+    }
+    model = lgb.train(
+        params,
+        datasets.train,
+        num_boost_round=num_boost_round,
+        valid_sets=[datasets.val],
+        callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)],
     )
+    val_mae = mean_absolute_error(datasets.y_val, model.predict(datasets.X_val))
 
     artifact = {
         "model": model,
-        "feature_cols": feature_cols,
-        "sku_label_encoder": sku_le,
+        "feature_cols": datasets.feature_cols,
+        "sku_label_encoder": datasets.sku_encoder,
         "config": cfg,
+        "val_mae": float(val_mae),
     }
     model_path = model_dir / "model.joblib"
     joblib.dump(artifact, model_path)
@@ -106,7 +112,6 @@ def main():
     cfg = load_config(Path(args.config))
     features_dir = Path(cfg["paths"]["features_data_dir"])
     normal_model_dir = Path(cfg["paths"]["normal_model_dir"])
-    date_col = cfg["data"]["date_column"]
 
     split_dir = features_dir / "splits"
     train_path = split_dir / "train.parquet"
@@ -117,14 +122,10 @@ def main():
             "Train/val splits not found. Run split.py before training."
         )
 
-    train_df = pd.read_parquet(train_path)
-    val_df = pd.read_parquet(val_path)
-    train_df[date_col] = pd.to_datetime(train_df[date_col])
-    val_df[date_col] = pd.to_datetime(val_df[date_col])
+    datasets = load_or_build_datasets(train_path, val_path, cfg, prepare_xy)
 
     model_path = train_model(
-        train_df=train_df,
-        val_df=val_df,
+        datasets=datasets,
         cfg=cfg,
         model_dir=normal_model_dir,
     )
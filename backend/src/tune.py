@@ -1,15 +1,19 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import joblib
+import lightgbm as lgb
 import numpy as np
 import pandas as pd
 import yaml
-from lightgbm import LGBMRegressor
 from sklearn.metrics import mean_absolute_error
 from sklearn.model_selection import ParameterSampler
 from sklearn.preprocessing import LabelEncoder
 
+from dataset_cache import DATASET_PARAMS, CachedDatasets, load_or_build_datasets
+
 
 def load_config(config_path: Path) -> dict:
     with config_path.open("r") as f:
@@ -19,6 +23,7 @@ def load_config(config_path: Path) -> dict:
 def prepare_xy(
     df: pd.DataFrame,
     cfg: dict,
+    sku_le: Optional[LabelEncoder] = None,
 ) -> Tuple[pd.DataFrame, np.ndarray, list[str], LabelEncoder]:
     target_col = cfg["data"]["target_column"]
     date_col = cfg["data"]["date_column"]
@@ -27,8 +32,14 @@ def prepare_xy(
 
     df = df.dropna().copy()
 
-    sku_le = LabelEncoder()
-    df[sku_col] = sku_le.fit_transform(df[sku_col].astype(str))
+    if sku_le is None:
+        sku_le = LabelEncoder()
+        df[sku_col] = sku_le.fit_transform(df[sku_col].astype(str))
+    else:
+        # Reuse the training codes so validation rows land in the same bins;
+        # SKUs unseen in training get -1
+        codes = {label: i for i, label in enumerate(sku_le.classes_)}
+        df[sku_col] = df[sku_col].astype(str).map(codes).fillna(-1).astype(int)
 
     feature_cols: list[str] = []
     feature_cols.extend(extra_features)
@@ -46,14 +57,63 @@ def prepare_xy(
     return X, y, feature_cols, sku_le
 
 
+# Per-process state filled in by _init_worker
+_worker: Dict = {}
+
+
+def _init_worker(
+    train_path: str, val_path: str, X_val: np.ndarray, y_val: np.ndarray
+) -> None:
+    train_set = lgb.Dataset(train_path, params=DATASET_PARAMS)
+    _worker["train"] = train_set
+    _worker["val"] = lgb.Dataset(val_path, reference=train_set, params=DATASET_PARAMS)
+    _worker["X_val"] = X_val
+    _worker["y_val"] = y_val
+
+
+def _fit_candidate(
+    params: Dict,
+    num_boost_round: int,
+    early_stopping_rounds: int,
+    return_model: bool,
+) -> Tuple[float, int, Optional[str]]:
+    """Train one candidate for `num_boost_round` rounds; return (val MAE, best iteration, model)."""
+    booster = lgb.train(
+        params,
+        _worker["train"],
+        num_boost_round=num_boost_round,
+        valid_sets=[_worker["val"]],
+        callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)],
+    )
+    preds = booster.predict(_worker["X_val"], num_iteration=booster.best_iteration)
+    mae = float(mean_absolute_error(_worker["y_val"], preds))
+    model_str = booster.model_to_string() if return_model else None
+    return mae, booster.best_iteration, model_str
+
+
+def _halving_budgets(min_rounds: int, max_rounds: int, eta: int) -> List[int]:
+    """Round budgets for each rung, growing by `eta` up to `max_rounds`."""
+    budgets = [max_rounds]
+    while budgets[0] // eta >= max(min_rounds, 1):
+        budgets.insert(0, budgets[0] // eta)
+    return budgets
+
+
 def random_search_tune(
-    train_df: pd.DataFrame,
-    val_df: pd.DataFrame,
+    datasets: CachedDatasets,
     cfg: dict,
 ) -> Dict:
-    X_train, y_train, feature_cols, sku_le = prepare_xy(train_df, cfg)
-    X_val, y_val, _, _ = prepare_xy(val_df, cfg)
-
+    """Random search over `tuning.param_distributions` on a process pool.
+
+    Workers load the binned Datasets from the dataset cache (the data is
+    binned once, or not at all if train.py already did) and each trains
+    with `num_threads = cpu_count // n_workers`, so concurrent candidates
+    do not oversubscribe the cores. With successive halving enabled, all
+    candidates first train for a small round budget and only the best
+    1/eta advance to the next rung (eta times more rounds) until the
+    survivors train for the full `num_boost_round`; early stopping also
+    cuts every fit short once the validation loss stalls.
+    """
     train_cfg = cfg["training"]
     tuning_cfg = cfg["tuning"]
 
@@ -69,40 +129,75 @@ def random_search_tune(
         n_iter=n_iter,
         random_state=random_state,
     )
-
-    best_score = float("inf")
-    best_params: Dict = {}
-    best_model = None
-
-    for params in sampler:
-        model = LGBMRegressor(
-            n_estimators=num_boost_round,
-            random_state=random_state,
-            objective="regression",
-            **params,
+    candidates = list(sampler)
+
+    cpu_count = os.cpu_count() or 1
+    n_workers = tuning_cfg.get("n_workers") or cpu_count
+    n_workers = max(1, min(int(n_workers), len(candidates), cpu_count))
+    threads_per_worker = max(1, cpu_count // n_workers)
+
+    halving_cfg = tuning_cfg.get("successive_halving", {}) or {}
+    if halving_cfg.get("enabled", True):
+        eta = max(2, int(halving_cfg.get("eta", 3)))
+        budgets = _halving_budgets(
+            int(halving_cfg.get("min_rounds", 50)), num_boost_round, eta
         )
-        model.fit(
-            X_train,
-            y_train,
-            eval_set=[(X_val, y_val)],
-            eval_metric="l2",
-            early_stopping_rounds=early_stopping_rounds,
-        )
-        preds = model.predict(X_val)
-        mae = mean_absolute_error(y_val, preds)
-        if mae < best_score:
-            best_score = mae
-            best_params = params
-            best_model = model
+    else:
+        eta = 1
+        budgets = [num_boost_round]
+
+    base_params = {
+        "objective": "regression",
+        "metric": "l2",
+        "seed": random_state,
+        "num_threads": threads_per_worker,
+        "verbose": -1,
+    }
 
-    assert best_model is not None
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=_init_worker,
+        initargs=(
+            str(datasets.train_path),
+            str(datasets.val_path),
+            datasets.X_val,
+            datasets.y_val,
+        ),
+    ) as pool:
+        survivors = list(range(len(candidates)))
+        for rung, budget in enumerate(budgets):
+            last_rung = rung == len(budgets) - 1 or len(survivors) == 1
+            futures = {
+                i: pool.submit(
+                    _fit_candidate,
+                    {**base_params, **candidates[i]},
+                    budget,
+                    early_stopping_rounds,
+                    last_rung,
+                )
+                for i in survivors
+            }
+            results = {i: f.result() for i, f in futures.items()}
+            ranked = sorted(survivors, key=lambda i: results[i][0])
+            print(
+                f"Rung {rung}: {len(survivors)} candidate(s) x {budget} rounds, "
+                f"best MAE {results[ranked[0]][0]:.4f}"
+            )
+            if last_rung:
+                break
+            survivors = ranked[: max(1, len(ranked) // eta)]
+
+    best = ranked[0]
+    best_score, best_iteration, model_str = results[best]
+    best_model = lgb.Booster(model_str=model_str)
 
     artifact = {
         "model": best_model,
-        "feature_cols": feature_cols,
-        "sku_label_encoder": sku_le,
+        "feature_cols": datasets.feature_cols,
+        "sku_label_encoder": datasets.sku_encoder,
         "config": cfg,
-        "best_params": best_params,
+        "best_params": candidates[best],
+        "best_iteration": best_iteration,
         "best_val_mae": best_score,
     }
     return artifact
@@ -123,7 +218,6 @@ def main():
     cfg = load_config(Path(args.config))
     features_dir = Path(cfg["paths"]["features_data_dir"])
     tuned_model_dir = Path(cfg["paths"]["tuned_model_dir"])
-    date_col = cfg["data"]["date_column"]
 
     split_dir = features_dir / "splits"
     train_path = split_dir / "train.parquet"
@@ -134,13 +228,10 @@ def main():
             "Train/val splits not found. Run split.py before tuning."
         )
 
-    train_df = pd.read_parquet(train_path)
-    val_df = pd.read_parquet(val_path)
-    train_df[date_col] = pd.to_datetime(train_df[date_col])
-    val_df[date_col] = pd.to_datetime(val_df[date_col])
+    datasets = load_or_build_datasets(train_path, val_path, cfg, prepare_xy)
 
     tuned_model_dir.mkdir(parents=True, exist_ok=True)
-    artifact = random_search_tune(train_df=train_df, val_df=val_df, cfg=cfg)
+    artifact = random_search_tune(datasets=datasets, cfg=cfg)
     model_path = tuned_model_dir / "model_tuned.joblib"
     joblib.dump(artifact, model_path)
 
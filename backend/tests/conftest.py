@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# `app` is imported as a package from backend/; the pipeline scripts in
+# backend/src are run as plain modules, so expose both.
+for path in (BACKEND_DIR, BACKEND_DIR / "src"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
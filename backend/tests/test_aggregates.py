@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.aggregates import compute_recent_aggregates
+
+
+def reference(history_df: pd.DataFrame, window_days: int = 90):
+    """The pandas groupby implementation the aggregates replaced."""
+    end = history_df["date"].max()
+    recent = history_df[history_df["date"] >= end - pd.Timedelta(days=window_days)]
+    daily = recent.groupby("date")["total_quantity"].sum().reset_index()
+    stats = recent.groupby("sku")["total_quantity"].agg(["mean", "std", "count"])
+    return daily, stats
+
+
+@pytest.fixture
+def dirty_history() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2024-01-01", periods=150)
+    df = pd.DataFrame(
+        {
+            "date": np.tile(dates, 3),
+            "sku": np.repeat(["a", "b", "c"], len(dates)).astype(object),
+            "total_quantity": rng.poisson(5, 3 * len(dates)).astype(float),
+        }
+    )
+    df.loc[rng.random(len(df)) < 0.05, "sku"] = None
+    df.loc[rng.random(len(df)) < 0.05, "date"] = pd.NaT
+    df.loc[rng.random(len(df)) < 0.05, "total_quantity"] = np.nan
+    return df
+
+
+def test_null_skus_and_dates_match_groupby(dirty_history):
+    aggregates = compute_recent_aggregates(dirty_history)
+    daily, stats = reference(dirty_history)
+
+    assert aggregates.end == dirty_history["date"].max()
+    np.testing.assert_array_equal(aggregates.daily["date"], daily["date"])
+    np.testing.assert_allclose(aggregates.daily["total_quantity"], daily["total_quantity"])
+    assert list(aggregates.sku_stats.index) == list(stats.index)
+    np.testing.assert_allclose(aggregates.sku_stats["avg"], stats["mean"])
+    np.testing.assert_allclose(aggregates.sku_stats["std"], stats["std"])
+    np.testing.assert_array_equal(aggregates.sku_stats["count"], stats["count"])
+
+
+def test_tiny_frame_with_null_sku():
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03"]),
+            "sku": ["a", None, "a"],
+            "total_quantity": [1.0, 2.0, 3.0],
+        }
+    )
+    aggregates = compute_recent_aggregates(df)
+    assert list(aggregates.sku_stats.index) == ["a"]
+    assert aggregates.sku_stats.loc["a", "avg"] == 2.0
+    assert aggregates.daily["total_quantity"].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_all_dates_missing_is_empty():
+    df = pd.DataFrame({"date": [pd.NaT, pd.NaT], "sku": ["a", "b"], "total_quantity": [1.0, 2.0]})
+    assert compute_recent_aggregates(df).empty
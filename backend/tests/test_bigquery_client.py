@@ -0,0 +1,143 @@
+import sys
+import types
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+try:
+    from google.cloud import bigquery  # noqa: F401
+except ImportError:
+    # Only the query-parameter types are touched without a real client
+    bigquery_stub = types.ModuleType("google.cloud.bigquery")
+    bigquery_stub.Client = object
+    bigquery_stub.QueryJobConfig = lambda query_parameters=(): types.SimpleNamespace(
+        query_parameters=list(query_parameters)
+    )
+    bigquery_stub.ScalarQueryParameter = lambda *args: args
+    cloud_stub = types.ModuleType("google.cloud")
+    cloud_stub.bigquery = bigquery_stub
+    sys.modules.setdefault("google", types.ModuleType("google")).cloud = cloud_stub
+    sys.modules["google.cloud"] = cloud_stub
+    sys.modules["google.cloud.bigquery"] = bigquery_stub
+
+from app.data import bigquery_client  # noqa: E402
+
+STORAGE_CLIENT = object()
+
+
+class FakeRows:
+    """Query result that serves one Arrow table as batches or as a DataFrame.
+
+    With a Storage API client the rows arrive in a few large streams; over
+    REST they come page by page.
+    """
+
+    def __init__(self, table: pa.Table):
+        self.table = table
+        self.bqstorage_clients = []
+
+    def to_arrow_iterable(self, bqstorage_client=None):
+        self.bqstorage_clients.append(bqstorage_client)
+        page_rows = 4 if bqstorage_client is None else 1000
+        return iter(self.table.to_batches(max_chunksize=page_rows))
+
+    def to_dataframe(self):
+        return self.table.to_pandas()
+
+
+class FakeClient:
+    def __init__(self, table: pa.Table):
+        self.rows = FakeRows(table)
+
+    def query(self, query, job_config=None):
+        return types.SimpleNamespace(result=lambda: self.rows)
+
+
+@pytest.fixture(autouse=True)
+def no_query_cache(monkeypatch):
+    monkeypatch.setattr(bigquery_client, "get_query_cache", lambda: None)
+
+
+@pytest.fixture(params=["storage", "rest"])
+def storage_client(request, monkeypatch):
+    client = STORAGE_CLIENT if request.param == "storage" else None
+    monkeypatch.setattr(bigquery_client, "_bqstorage_client", lambda: client)
+    return client
+
+
+def _context_rows() -> pa.Table:
+    """What BigQuery returns for the demand-with-context query, nulls included."""
+    n = 10
+    return pa.table(
+        {
+            "date": pa.array([date(2024, 1, 1 + i % 5) for i in range(n)], pa.date32()),
+            "sku": [" [101]", "102 ", "[103]", "104", " 105 "] * 2,
+            "total_quantity": pa.array(range(1, n + 1), pa.int64()),
+            "event_count": pa.array([3, None] * 5, pa.int64()),
+            "active_users": pa.array([None, 7] * 5, pa.int64()),
+            "product_category": ["Shoes", None] * 5,
+            "price": pa.array([9.5, None] * 5, pa.float64()),
+        }
+    )
+
+
+def _expected_frame(rows: FakeRows) -> pd.DataFrame:
+    """The frame the client built from `to_dataframe()` before streaming Arrow."""
+    df = rows.to_dataframe()
+    # pandas 2 (pinned in requirements.txt) parsed dates to nanoseconds
+    df["date"] = pd.to_datetime(df["date"]).astype("datetime64[ns]")
+    df["sku"] = df["sku"].astype(str).str.strip().str.strip("[]")
+    df["total_quantity"] = df["total_quantity"].astype(float)
+    if "event_count" in df.columns:
+        df["event_count"] = df["event_count"].fillna(0.0).astype(float)
+        df["active_users"] = df["active_users"].fillna(0.0).astype(float)
+        df["price"] = df["price"].astype(float)
+        # astype(str) under the pinned pandas 2 spelled missing categories "None"
+        df["product_category"] = df["product_category"].fillna("None").astype(str)
+    return df
+
+
+def test_storage_client_is_none_without_the_storage_library(monkeypatch):
+    monkeypatch.setitem(sys.modules, "google.cloud.bigquery_storage", None)
+    assert bigquery_client._bqstorage_client() is None
+
+
+def test_demand_with_context_batches_match_to_dataframe(storage_client):
+    client = FakeClient(_context_rows())
+    batches = list(
+        bigquery_client.iter_demand_with_context_batches(client=client, materialize=False)
+    )
+
+    assert client.rows.bqstorage_clients == [storage_client]
+    assert len(batches) == (1 if storage_client else 3)
+    assert all(b.schema == bigquery_client.DEMAND_WITH_CONTEXT_SCHEMA for b in batches)
+
+    frame = bigquery_client._batches_to_frame(
+        iter(batches), bigquery_client.DEMAND_WITH_CONTEXT_SCHEMA
+    )
+    expected = _expected_frame(client.rows)
+    pd.testing.assert_frame_equal(frame, expected[frame.columns])
+    assert str(frame["date"].dtype) == "datetime64[ns]"
+
+
+def test_daily_demand_batches_match_to_dataframe(storage_client):
+    client = FakeClient(_context_rows().select(["date", "sku", "total_quantity"]))
+    frame = bigquery_client._batches_to_frame(
+        bigquery_client.iter_daily_demand_batches(client=client),
+        bigquery_client.DAILY_DEMAND_SCHEMA,
+    )
+    expected = _expected_frame(client.rows)[frame.columns]
+    pd.testing.assert_frame_equal(frame, expected)
+
+
+def test_empty_result_keeps_the_schema_dtypes(storage_client):
+    client = FakeClient(_context_rows().slice(0, 0))
+    frame = bigquery_client._batches_to_frame(
+        bigquery_client.iter_daily_demand_batches(client=client),
+        bigquery_client.DAILY_DEMAND_SCHEMA,
+    )
+    assert frame.empty
+    assert list(frame.columns) == ["date", "sku", "total_quantity"]
+    assert str(frame["total_quantity"].dtype) == "float64"
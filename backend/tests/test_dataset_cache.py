@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+import dataset_cache as src_dataset_cache
+from app.training import dataset_cache
+
+
+def _frame(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "date": pd.date_range("2024-01-01", periods=n, freq="D"),
+            "sku": rng.choice(["a", "b", "c"], size=n),
+            "x1": rng.normal(size=n),
+            "x2": rng.normal(size=n),
+            "y": rng.gamma(2.0, size=n),
+        }
+    )
+
+
+def _prepare(columns):
+    def prepare_xy(df, sku_encoder=None):
+        if sku_encoder is None:
+            sku_encoder = LabelEncoder().fit(df["sku"].astype(str))
+        X = df[columns].copy()
+        X["sku"] = sku_encoder.transform(df["sku"].astype(str))
+        return X, df["y"].to_numpy(dtype=float), list(X.columns), sku_encoder
+
+    return prepare_xy
+
+
+def _entries(cache_dir):
+    return sorted(p.name for p in cache_dir.iterdir() if not p.name.startswith("."))
+
+
+def test_entry_is_reused_until_the_feature_layout_changes(tmp_path):
+    train_df, val_df = _frame(seed=0), _frame(seed=1)
+
+    first = dataset_cache.load_or_build_datasets(
+        train_df, val_df, _prepare(["x1", "x2"]), cache_dir=tmp_path
+    )
+    again = dataset_cache.load_or_build_datasets(
+        train_df, val_df, _prepare(["x1", "x2"]), cache_dir=tmp_path
+    )
+    assert first.train_path == again.train_path
+    assert len(_entries(tmp_path)) == 1
+
+    # Same frames, different columns out of prepare_xy: must not reuse the bins
+    fewer = dataset_cache.load_or_build_datasets(
+        train_df, val_df, _prepare(["x1"]), cache_dir=tmp_path
+    )
+    assert fewer.train_path != first.train_path
+    assert fewer.feature_cols == ["x1", "sku"]
+    assert fewer.X_val.shape == (len(val_df), 2)
+    assert list(fewer.sku_encoder.classes_) == ["a", "b", "c"]
+
+
+def test_pipeline_adapter_shares_the_app_cache(tmp_path):
+    train_df, val_df = _frame(seed=0), _frame(seed=1)
+    train_df.to_parquet(tmp_path / "train.parquet")
+    val_df.to_parquet(tmp_path / "val.parquet")
+    cfg = {"data": {"date_column": "date"}, "paths": {"dataset_cache_dir": str(tmp_path / "cache")}}
+    prepare = _prepare(["x1", "x2"])
+
+    datasets = src_dataset_cache.load_or_build_datasets(
+        tmp_path / "train.parquet",
+        tmp_path / "val.parquet",
+        cfg,
+        lambda df, cfg, sku_le=None: prepare(df, sku_encoder=sku_le),
+    )
+    assert isinstance(datasets.sku_encoder, LabelEncoder)
+    assert list(datasets.sku_encoder.classes_) == ["a", "b", "c"]
+
+    direct = dataset_cache.load_or_build_datasets(
+        train_df, val_df, prepare, cache_dir=tmp_path / "cache"
+    )
+    assert direct.train_path == datasets.train_path
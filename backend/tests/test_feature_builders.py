@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import features as pipeline_features
+from app.features import feature_engineering
+
+LAGS = [1, 7, 14, 28]
+WINDOWS = [3, 7, 14]
+
+
+
+@pytest.fixture(scope="module")
+def sales() -> pd.DataFrame:
+    """~200k daily rows over SKUs of uneven length, with missing targets."""
+    rng = np.random.default_rng(7)
+    frames = []
+    for i in range(1000):
+        days = int(rng.integers(1, 400))
+        frames.append(
+            pd.DataFrame(
+                {
+                    "date": pd.date_range("2022-01-01", periods=days),
+                    "sku": f"SKU{i:04d}",
+                    "sales": rng.poisson(5, days).astype(float),
+                }
+            )
+        )
+    df = pd.concat(frames, ignore_index=True)
+    df.loc[rng.random(len(df)) < 0.01, "sales"] = np.nan
+    # Shuffle so builders have to do their own sorting
+    return df.sample(frac=1.0, random_state=0).reset_index(drop=True)
+
+
+def reference_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-SKU pandas reference: each series is shifted and rolled on its own."""
+    df = df.sort_values(["sku", "date"])
+    grouped = df.groupby("sku")["sales"]
+    for lag in LAGS:
+        df[f"lag_{lag}"] = grouped.shift(lag)
+    for window in WINDOWS:
+        df[f"rolling_mean_{window}"] = grouped.transform(
+            lambda s, w=window: s.shift(1).rolling(w).mean()
+        )
+    return df
+
+
+@pytest.fixture(scope="module")
+def reference(sales: pd.DataFrame) -> pd.DataFrame:
+    return reference_features(sales)
+
+
+def test_pipeline_uses_the_app_implementation():
+    assert pipeline_features.lag_rolling_features is feature_engineering.lag_rolling_features
+
+
+def test_lag_rolling_features_match_reference(reference):
+    features = feature_engineering.lag_rolling_features(
+        reference["sku"].to_numpy(), reference["sales"].to_numpy(), LAGS, WINDOWS
+    )
+    assert sorted(features) == sorted(f"lag_{lag}" for lag in LAGS) + sorted(
+        f"rolling_mean_{w}" for w in WINDOWS
+    )
+    for column, values in features.items():
+        # Integer-valued targets: cumulative-sum windows are exact
+        np.testing.assert_array_equal(values, reference[column].to_numpy(), err_msg=column)
+
+
+def test_rounding_does_not_carry_across_series():
+    """A long, large-valued series sorted first must not blur a small one after it."""
+    rng = np.random.default_rng(3)
+    big = rng.gamma(2.0, 1e6, 500_000)
+    small = rng.gamma(2.0, 1.0, 1_000)
+    df = pd.DataFrame(
+        {
+            "date": np.r_[np.arange(len(big)), np.arange(len(small))],
+            "sku": ["A"] * len(big) + ["B"] * len(small),
+            "sales": np.r_[big, small],
+        }
+    )
+    expected = reference_features(df)
+    features = feature_engineering.lag_rolling_features(
+        df["sku"].to_numpy(), df["sales"].to_numpy(), LAGS, WINDOWS
+    )
+    is_small = (df["sku"] == "B").to_numpy()
+    for window in WINDOWS:
+        column = f"rolling_mean_{window}"
+        np.testing.assert_allclose(
+            features[column][is_small],
+            expected[column].to_numpy()[is_small],
+            rtol=1e-12,
+            atol=1e-12,
+            err_msg=column,
+        )
+
+
+def test_lag_rolling_features_empty():
+    features = feature_engineering.lag_rolling_features(np.array([]), np.array([]), [1], [2])
+    assert all(len(v) == 0 for v in features.values())
+
+
+def test_build_time_series_features_matches_reference(sales, reference):
+    df = sales.rename(columns={"sales": "total_quantity"})
+    built = feature_engineering.build_time_series_features(df, LAGS, WINDOWS)
+    expected = reference.loc[built.index]
+    for column in [f"lag_{lag}" for lag in LAGS] + [f"rolling_mean_{w}" for w in WINDOWS]:
+        np.testing.assert_array_equal(built[column].to_numpy(), expected[column].to_numpy())
+
+
+def test_streaming_and_incremental_builds_match_in_memory(sales, tmp_path):
+    sales = sales.sort_values("date", kind="stable")
+    args = dict(
+        date_column="date",
+        sku_column="sku",
+        target_column="sales",
+        lags=LAGS,
+        rolling_mean_windows=WINDOWS,
+    )
+    sales.to_parquet(tmp_path / "sales.parquet", index=False)
+    expected = pd.read_parquet(
+        pipeline_features.build_features(tmp_path / "sales.parquet", tmp_path / "full", **args)
+    )
+
+    streamed = pd.read_parquet(
+        pipeline_features.build_features_streaming(
+            tmp_path / "sales.parquet", tmp_path / "streamed", batch_rows=9973, **args
+        )
+    )
+
+    cutoff = sales["date"].quantile(0.8)
+    sales[sales["date"] <= cutoff].to_parquet(tmp_path / "sales.parquet", index=False)
+    pipeline_features.build_features(tmp_path / "sales.parquet", tmp_path / "incremental", **args)
+    sales.to_parquet(tmp_path / "sales.parquet", index=False)
+    updated = pd.read_parquet(
+        pipeline_features.update_features(tmp_path / "sales.parquet", tmp_path / "incremental", **args)
+    )
+
+    order = ["sku", "date"]
+    expected = expected.sort_values(order).reset_index(drop=True)
+    for result in (streamed, updated):
+        result = result.sort_values(order).reset_index(drop=True)[expected.columns]
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
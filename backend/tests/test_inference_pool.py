@@ -0,0 +1,36 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.inference_pool import InferencePool, PoolSaturatedError
+
+
+def test_cancelled_request_keeps_its_slot_until_the_job_finishes():
+    pool = InferencePool(max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        task = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The job is still running on the worker, so the slot is still taken
+        assert pool.stats()["pending"] == 1
+        with pytest.raises(PoolSaturatedError):
+            await asyncio.wait_for(pool.run(lambda: None), timeout=5)
+
+        release.set()
+        for _ in range(100):
+            if pool.stats()["pending"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.stats()["pending"] == 0
+        assert await asyncio.wait_for(pool.run(lambda: 42), timeout=5) == 42
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
@@ -0,0 +1,31 @@
+import numpy as np
+
+import predict
+from app.features.feature_engineering import lag_rolling_features
+from app.features.lag_state import LagState
+
+LAGS = [1, 7, 14]
+WINDOWS = [3, 7, 14]
+
+
+def test_batch_forecasts_use_the_app_lag_state():
+    assert predict.LagState is LagState
+
+
+def test_lag_state_steps_match_feature_builder():
+    rng = np.random.default_rng(5)
+    series = rng.gamma(2.0, 3.0, size=(4, 60))
+    warmup = 20
+
+    state = LagState(series[:, :warmup], LAGS, WINDOWS)
+    expected = [
+        lag_rolling_features(np.zeros(series.shape[1]), row, LAGS, WINDOWS) for row in series
+    ]
+    for step in range(warmup, series.shape[1]):
+        for lag in LAGS:
+            want = [features[f"lag_{lag}"][step] for features in expected]
+            np.testing.assert_array_equal(state.lag(lag), want)
+        for window in WINDOWS:
+            want = [features[f"rolling_mean_{window}"][step] for features in expected]
+            np.testing.assert_allclose(state.rolling_mean(window), want, rtol=1e-12)
+        state.push(series[:, step])
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.services import precomputed
+from app.services.history_index import HistoryIndex
+
+
+@pytest.fixture
+def batch_table(tmp_path, monkeypatch):
+    cfg = {
+        "data": {"date_column": "date", "sku_column": "sku"},
+        "forecast": {"default_horizons": [2]},
+        "paths": {"forecast_output_dir": str(tmp_path)},
+    }
+    monkeypatch.setattr(precomputed, "load_config", lambda: cfg)
+    monkeypatch.setattr(precomputed, "_tables", {})
+
+    def write(metadata):
+        frame = pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2024-01-06", "2024-01-07"] * 2),
+                "sku": ["a", "a", "b", "b"],
+                "forecast": [1.0, 2.0, 3.0, 4.0],
+            }
+        )
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({**table.schema.metadata, **metadata})
+        pq.write_table(table, tmp_path / "forecasts_h2.parquet")
+
+    return write
+
+
+STAMP = {
+    precomputed.MODEL_VERSION_KEY: b"dir:v1",
+    precomputed.AS_OF_KEY: b"2024-01-05",
+}
+AS_OF = np.datetime64("2024-01-05", "ns")
+
+
+def test_lookup_serves_table_stamped_for_current_artifact(batch_table):
+    batch_table(STAMP)
+    frame = precomputed.lookup_precomputed("b", 2, "dir:v1", AS_OF)
+    assert frame["forecast"].tolist() == [3.0, 4.0]
+    assert precomputed.lookup_precomputed("missing", 2, "dir:v1", AS_OF) is None
+
+
+@pytest.mark.parametrize(
+    "version, as_of",
+    [
+        ("dir:v2", AS_OF),
+        ("dir:v1", np.datetime64("2024-01-06", "ns")),
+    ],
+)
+def test_lookup_skips_table_from_another_model_or_history(batch_table, version, as_of):
+    batch_table(STAMP)
+    assert precomputed.lookup_precomputed("a", 2, version, as_of) is None
+
+
+def test_lookup_skips_unstamped_table(batch_table):
+    batch_table({})
+    assert precomputed.lookup_precomputed("a", 2, "dir:v1", AS_OF) is None
+
+
+def test_history_end_date_is_latest_date_across_skus():
+    history = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-03", "2024-01-05", "2024-01-04"]),
+            "sku": ["b", "a", "b"],
+            "total_quantity": [1.0, 2.0, 3.0],
+        }
+    )
+    assert HistoryIndex(history).end_date == AS_OF
+    assert HistoryIndex(history.iloc[:0]).end_date is None
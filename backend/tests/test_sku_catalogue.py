@@ -0,0 +1,78 @@
+import pytest
+
+from app.services.sku_catalogue import SkuCatalogue
+from app.services.sku_registry import SkuRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyLoader:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return SkuRegistry(result)
+
+
+def test_failed_refresh_keeps_previous_registry_and_etag():
+    clock = FakeClock()
+    loader = FlakyLoader(["a", "b"], RuntimeError("bigquery down"), ["a", "b", "c"])
+    catalogue = SkuCatalogue(loader, refresh_interval=100, clock=clock)
+
+    registry, etag = catalogue.get()
+    assert registry.all() == ["a", "b"]
+
+    clock.now = 150
+    catalogue._refresh_in_background()
+    assert loader.calls == 2
+    assert catalogue.get() == (registry, etag)
+
+    # Retried one interval after the failure, not on every request
+    clock.now = 200
+    assert catalogue.get() == (registry, etag)
+    assert loader.calls == 2
+    clock.now = 251
+    catalogue._refresh_in_background()
+    new_registry, new_etag = catalogue.get()
+    assert new_registry.all() == ["a", "b", "c"]
+    assert new_etag != etag
+
+
+def test_first_load_falls_back_and_retries_after_the_short_interval():
+    clock = FakeClock()
+    loader = FlakyLoader(RuntimeError("bigquery down"), ["x", "y"])
+    catalogue = SkuCatalogue(
+        loader,
+        refresh_interval=900,
+        clock=clock,
+        fallback=lambda: SkuRegistry(["from-artifact"]),
+        retry_interval=30,
+    )
+
+    registry, _ = catalogue.get()
+    assert registry.all() == ["from-artifact"]
+
+    clock.now = 31
+    catalogue._refresh_in_background()
+    registry, _ = catalogue.get()
+    assert registry.all() == ["x", "y"]
+    assert catalogue._refresh_at == 31 + 900
+
+
+def test_first_load_without_fallback_raises_and_retries_on_next_call():
+    loader = FlakyLoader(RuntimeError("bigquery down"), ["a"])
+    catalogue = SkuCatalogue(loader, clock=FakeClock())
+    with pytest.raises(RuntimeError):
+        catalogue.get()
+    assert catalogue.get()[0].all() == ["a"]